@@ -1,5 +1,5 @@
 import utils
-import requests
+import api
 
 def account():
     utils.clear_screen()
@@ -16,7 +16,7 @@ def account():
         while new_password == password:
             new_password = input("New password: (Enter to preserve) ")
 
-        address = f"{utils.read_config('server_url')}/online/change_data"
+        address = "/online/change_data"
         if new_username != username and new_password != password:
             mode = 'everything'
         elif new_username != username:
@@ -30,10 +30,10 @@ def account():
         response = None
         response2 = None
         if mode in ['everything', "username"]:
-            response = requests.get(f'{address}/user?user={username}&auth={password}&new_user={new_username}')
+            response = api.get(f'{address}/user', {'user': username, 'auth': password, 'new_user': new_username})
         if mode in ['everything', "password"]:
             target_user = username if mode == 'password' else new_username
-            response2 = requests.get(f"{address}/auth?user={target_user}&auth={password}&new_auth={new_password}")
+            response2 = api.get(f"{address}/auth", {'user': target_user, 'auth': password, 'new_auth': new_password})
 
         if response is not None and response2 is not None:
             if response.status_code == 200 and response2.status_code == 200:
@@ -52,8 +52,7 @@ def account():
             utils.write_config("username", new_username)
     if input("Do you want to delete your account? (y/n) ").lower() == "y":
         if input("Confirm by typing 'delete' ").lower() == "delete":
-            address = f"{utils.read_config('server_url')}/online/delete_account"
-            response = requests.get(f"{address}?user={username}&auth={password}")
+            response = api.get("/online/delete_account", {'user': username, 'auth': password})
             if response.status_code == 200:
                 print("Deleted the account successfully")
                 utils.write_config("password", "")
@@ -3,19 +3,37 @@ from randomword import *
 from openai import OpenAI
 import utils
 import requests
+from shared import catalogue, wordcheck
 
 disabled_models = ["google/gemini-2.5-flash-image", 'whisper', 'tts', 'dall-e', 'embedding', 'moderation']
+# Answers of the models about guessed words, kept between games
+CACHE_PATH = 'ai_cache.sqlite3'
+CACHE_TTL = 30 * 86400
+# Model lists of the AI providers, kept between runs and refreshed in the background once older than the TTL
+MODELS_PATH = 'ai_models.json'
+MODELS_TTL = 3600
+
+_word_checker = None
+
+def fetch_models(url):
+    models_raw = requests.get(
+        url=f"{url}/models",
+        headers={"Authorization": f"Bearer {utils.read_config("ai_api_key")}"},
+        timeout=10
+    ).json()["data"]
+    models = []
+    for model in models_raw:
+        models.append(model["id"])
+    return [model for model in models if model not in disabled_models]
+
+_model_catalogue = catalogue.ModelCatalogue(fetch_models, lambda: MODELS_TTL, MODELS_PATH)
+
+def available_models():
+    return _model_catalogue.get(utils.read_config("ai_url"))
 
 def start_ai_client(language):
     if not utils.read_config("ai_model"):
-        models_raw = requests.get(
-            url=f"{utils.read_config("ai_url")}/models",
-            headers={"Authorization": f"Bearer {utils.read_config("ai_api_key")}"}
-        ).json()["data"]
-        models = []
-        for model in models_raw:
-            models.append(model["id"])
-        models = [model for model in models if model not in disabled_models]
+        models = available_models()
     else:
         models = []
 
@@ -37,23 +55,20 @@ def start_ai_client(language):
 
 def check_guess(language, word):
     if not utils.read_config("ai_model"):
-        models_raw = requests.get(
-            url=f"{utils.read_config("ai_url")}/models",
-            headers={"Authorization": f"Bearer {utils.read_config("ai_api_key")}"}
-        ).json()["data"]
-        models = []
-        for model in models_raw:
-            models.append(model["id"])
-        models = [model for model in models if model not in disabled_models]
+        models = available_models()
     else:
         models = [utils.read_config("ai_model")]
 
+    model = random.choice(models) if models else "google/gemini-2.5-flash"
+    return word_checker().check(model, language, word)
+
+def ask_model(model, language, word):
     client = OpenAI(
         api_key=utils.read_config("ai_api_key"),
         base_url=utils.read_config("ai_url")
     )
     response = client.chat.completions.create(
-        model=(random.choice(models) if models else "google/gemini-2.5-flash"),
+        model=model,
         messages=[
             {"role": "system", "content": "You are a wordle game provider."},
             {"role": "user", "content": f"Check if the word '{word}' is a correct 5-character word in {language} for a Wordle-style game. Reply with only True or False and no additional text."}
@@ -61,6 +76,17 @@ def check_guess(language, word):
     )
     return str(response.choices[0].message.content).lower() == "true"
 
+# Guesses in an offline wordlist of the language are accepted without asking the model
+def local_wordlist(language):
+    return utils.wordlist(language) if language in utils.languages() else None
+
+# Checks guesses against the offline wordlist, then the answers cached from earlier games, then the model
+def word_checker():
+    global _word_checker
+    if _word_checker is None:
+        _word_checker = wordcheck.WordChecker(ask_model, wordcheck.ValidationCache(CACHE_PATH, lambda: CACHE_TTL), local_wordlist)
+    return _word_checker
+
 def game(word, tries, language, letters):
     utils.clear_screen()
     print("Starting the game!")
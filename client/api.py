@@ -0,0 +1,67 @@
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import utils
+
+# (connect, read) timeouts in seconds
+TIMEOUT = (5, 20)
+RETRIES = 3
+BACKOFF = 0.5
+# Proxy answers a request is sent again for, it may or may not have reached the app
+RETRY_STATUSES = (502, 503)
+# GETs that change state on the server, a router 502/503 can arrive after the app applied them
+STATE_CHANGING = ("/online/start", "/online/guess", "/online/session/start", "/online/session/guess", "/online/create_user", "/online/delete_account", "/online/change_data/")
+
+# HTTP client for the Wordle server
+# One keep-alive connection pool for the whole session, so only the first request pays for the TCP/TLS handshake
+class WordleApiClient:
+    def __init__(self, server_url=None, timeout=TIMEOUT, retries=RETRIES, backoff=BACKOFF):
+        self.server_url = server_url
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.session = requests.Session()
+        self.session.headers["Accept-Encoding"] = "gzip, deflate"
+        # The pool only retries connections that failed before the request was sent
+        # Read errors are not retried since a guess must not be sent twice, 502/503 are retried in get()
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=0,
+            status=0,
+            backoff_factor=backoff,
+            allowed_methods=frozenset({"GET"}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=8, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def url(self, path, server=None):
+        server = server or self.server_url or utils.read_config("server_url")
+        return f"{server.rstrip('/')}{path}"
+
+    # GET on the configured server, or on `server` while one is being set up
+    # A 502/503 is retried with backoff, except on the endpoints that change state
+    def get(self, path, params=None, server=None, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        url = self.url(path, server)
+        retries = 0 if path.startswith(STATE_CHANGING) else self.retries
+        for attempt in range(retries + 1):
+            response = self.session.get(url, params=params, **kwargs)
+            if response.status_code not in RETRY_STATUSES or attempt == retries:
+                return response
+            response.close()
+            time.sleep(self.backoff * 2 ** attempt)
+
+_client = None
+
+def client():
+    global _client
+    if _client is None:
+        _client = WordleApiClient()
+    return _client
+
+def get(path, params=None, server=None, **kwargs):
+    return client().get(path, params, server, **kwargs)
@@ -1,8 +1,10 @@
 import utils
-import requests
 
 def get_leaderboard(state, user, auth):
-    response = requests.get(f"{utils.read_config('server_url')}/online/leaderboard?state={state}&user={user}&auth={auth}")
+    response = utils.auth_get("/online/leaderboard", user, auth, {'state': state})
+    if response.status_code != 200:
+        print(f"Error fetching the leaderboard: {response.status_code} - {response.text}")
+        return None, None, None, None, None
     decoded = utils.json_decode(response.text)
     top_points = decoded['top_points']
     top_matches = decoded['top_matches']
@@ -22,6 +24,9 @@ def leaderboard():
 
     while True:
         top_points, top_matches, top_avg_time, top_winrate, user_position = get_leaderboard('basic', user, auth)
+        if top_points is None:
+            input("\nPress `Enter` to exit...")
+            break
 
         print("=" * 120)
         print("🏆  LEADERBOARD  🏆".center(120))
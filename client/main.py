@@ -1,6 +1,9 @@
+import os
+import sys
+# The modules shared with the server live in ../shared, next to ../data
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
 import time
 import utils
-import os
 
 from updater import update
 from ai import game_ai
@@ -1,6 +1,8 @@
 import utils
+import api
 import requests
 import time
+from shared import feedback
 from statistics import stats
 from configuration import configuration
 from leaderboard import leaderboard
@@ -15,19 +17,24 @@ def connection():
     user, auth = auth_check()
     create_user(user, auth, server_url)
     while True:
-        server_status = requests.get(f"{server_url}/server_check")
-        account_status = requests.get(f"{server_url}/online/auth_check?user={utils.read_config('username')}&auth={utils.read_config('password')}")
-        available_languages = requests.get(f"{server_url}/online/languages")
+        server_status = api.get("/server_check", server=server_url)
+        account_status = api.get("/online/auth_check", {'user': utils.read_config('username'), 'auth': utils.read_config('password')}, server=server_url)
+        manifest = utils.language_manifest()
 
         language_status = {}
 
-        if available_languages.status_code == 200:
-            languages = available_languages.text.split()
-            for language in languages:
-                language_status[language] = utils.language_check(language)
-            for language, status in language_status.items():
-                if status == "Local language file invalid":
-                    language_status[language] = utils.language_download(language)
+        if manifest is not None:
+            language_status = utils.language_sync(manifest)
+        else:
+            # Older servers have no manifest, check the languages one at a time
+            available_languages = api.get("/online/languages", server=server_url)
+            if available_languages.status_code == 200:
+                languages = available_languages.text.split()
+                for language in languages:
+                    language_status[language] = utils.language_check(language)
+                for language, status in language_status.items():
+                    if status == "Local language file invalid":
+                        language_status[language] = utils.language_download(language)
 
         utils.clear_screen()
         print("Connection status:")
@@ -69,8 +76,80 @@ def guess_decoder(guesses, formatted_guesses):
         output.append("".join(guess_output))
     return output
 
-def game(user, auth, language):
-    response = requests.get(f"{utils.read_config('server_url')}/online/start?user={user}&auth={auth}&language={language}")
+# Ranked game over a game session: authenticates once, then each guess sends only the word
+# The server answers with the guess's pattern and the unused-letter bitmask
+def game(user, auth, language, hard_mode=False):
+    response = utils.auth_get("/online/session/start", user, auth, {'language': language, **({'hard_mode': 1} if hard_mode else {})})
+    if response.status_code == 404:
+        # Older servers have no game sessions
+        return game_legacy(user, auth, language, hard_mode)
+    if response.status_code != 200:
+        print("Invalid details. Please try again in a minute.")
+        if response.status_code == 400:
+            print("Unallowed username")
+        if response.status_code == 403:
+            print("User blacklisted")
+        input("Press `Enter` to continue...")
+        return None, None, None, None, 1
+
+    started = response.json()
+    session = started["session"]
+    alphabet = started["letters"]
+    length = started["length"]
+    tries = started["tries"]
+
+    utils.clear_screen()
+    print("Starting the game!")
+    time.sleep(1)
+    utils.clear_screen()
+
+    game_time = 0
+    guess_number = 0
+    guesses = []
+    decoded_guesses = []
+    formatted_guesses = []
+    letters = list(alphabet)
+    game_status = 1
+
+    while game_status == 1:
+        utils.clear_screen()
+        if decoded_guesses:
+            print("Current guesses:")
+            for i in decoded_guesses:
+                print(i)
+            print()
+
+        print(f"Remaining guesses: {tries-guess_number}")
+        print(f"Unused letters: {utils.format_unused_letters(letters)}")
+
+        guess = input(f"\nWrite your {utils.ordinal(guess_number+1)} guess: ").lower()
+        if len(guess) == length and guess in utils.wordlist(language, True):
+            response = api.get("/online/session/guess", {'session': session, 'guess': guess})
+            if response.status_code == 200:
+                delta = response.json()
+                guesses.append(guess)
+                formatted_guesses.append(feedback.statuses(delta["pattern"], length))
+                letters = [letter for i, letter in enumerate(alphabet) if delta["letters"] >> i & 1]
+                guess_number = delta["guess_number"]
+                decoded_guesses = guess_decoder(guesses, formatted_guesses)
+                game_time = delta["time"]
+                game_status = delta["game_status"]
+            elif response.status_code in (401, 403, 404) or response.text == "Game ended":
+                # The session expired or the game is gone, no later guess can succeed
+                print(f"Error: {response.text}")
+                print("This game can't be continued, start a new one from the menu.")
+                input("Press `Enter` to continue...")
+                return None, None, None, None, 1
+            else:
+                print(f"Error: {response.text}")
+                time.sleep(1)
+                if guess_number >= tries:
+                    game_status = 0
+
+    return letters, formatted_guesses, guess_number, decoded_guesses, game_status, game_time
+
+def game_legacy(user, auth, language, hard_mode=False):
+    response = utils.auth_get("/online/start", user, auth, {'language': language, **({'hard_mode': 1} if hard_mode else {})})
     if response.status_code != 200:
         print("Invalid details. Please try again in a minute.")
         if response.status_code == 400:
@@ -105,7 +184,7 @@ def game(user, auth, language):
 
         guess = input(f"\nWrite your {utils.ordinal(guess_number+1)} guess: ").lower()
         if len(guess) == 5 and guess in utils.wordlist(language, True):
-            response = requests.get(f"{utils.read_config('server_url')}/online/guess?user={user}&auth={auth}&guess={guess}")
+            response = utils.auth_get("/online/guess", user, auth, {'guess': guess})
             if response.status_code == 200:
                 decoded = utils.json_decode(response.text)
                 letters = decoded["letters"]
@@ -124,13 +203,13 @@ def game(user, auth, language):
     return letters, formatted_guesses, guess_number, decoded_guesses, game_status, game_time
 
 def create_user(user, auth, server):
-    response = requests.get(f"{server}/online/auth_check?user={user}&auth={auth}")
+    response = api.get("/online/auth_check", {'user': user, 'auth': auth}, server=server)
     while response.status_code != 200:
         utils.clear_screen()
         if response.status_code == 401:
             inp = input("Account does not exist. Do you want to create one? (Y/N): ").strip().lower()
             if inp == "y":
-                create = requests.get(f"{server}/online/create_user?user={user}&auth={auth}")
+                create = api.get("/online/create_user", {'user': user, 'auth': auth}, server=server)
                 if create.status_code == 200:
                     print("User created successfully!")
                 if create.status_code == 400:
@@ -157,7 +236,7 @@ def create_user(user, auth, server):
             print("An error has occurred. Please try again in a few minutes.")
             input("Press `Enter` to continue...")
             return 1
-        response = requests.get(f"{server}/online/auth_check?user={user}&auth={auth}")
+        response = api.get("/online/auth_check", {'user': user, 'auth': auth}, server=server)
 
     utils.write_config("username", user)
     utils.write_config("password", auth)
@@ -180,7 +259,7 @@ def auth_check():
 
 def version_check():
     server = utils.read_config("server_url")
-    server_version = requests.get(f"{server}/online/version").text
+    server_version = api.get("/online/version", server=server).text
     loaded = utils.json_decode(open("../data.json", "r", encoding="utf-8").read())
     if server_version != loaded["version"]:
         print("Version mismatch. Update your client or notify the server owner.")
@@ -194,15 +273,17 @@ def server_check():
         server = input("Please enter your full server address (i.e., https://wordle.ketrax.ovh): ").strip()
         try:
             if server and not server.startswith(('http://', 'https://')):
-                if requests.get(f"https://{server}/server_check").status_code == 200:
+                if api.get("/server_check", server=f"https://{server}").status_code == 200:
                     server = 'https://' + server
                 else:
                     server = 'http://' + server
         except requests.exceptions.RequestException:
             server = None
+        if not server:
+            continue
 
         try:
-            response = requests.get(f"{server}/server_check", timeout=5)
+            response = api.get("/server_check", server=server, timeout=5)
             if response.text != "Server is running":
                 print(f"Server did not respond correctly. Please try again.")
                 server = None
@@ -217,7 +298,7 @@ def server_check():
             utils.write_config("server_url", server)
 
     try:
-        response = requests.get(f"{server}/server_check", timeout=5)
+        response = api.get("/server_check", server=server, timeout=5)
         if response.text != "Server is running":
             print(f"The server ({server}) is not running. Please try again in a few minutes or change the address in configuration")
             input("Press `Enter` to continue...")
@@ -246,7 +327,7 @@ def game_online():
     response = create_user(user, auth, server)
 
     language = utils.read_config("language")
-    languages_response = requests.get(f"{server}/online/languages")
+    languages_response = api.get("/online/languages", server=server)
     languages = [lang.strip() for lang in languages_response.text.strip().split(',')] if languages_response.status_code == 200 else []
     while language not in languages:
         language = input(f"Choose the language ({','.join(languages)}): ").strip().lower()
@@ -261,8 +342,8 @@ def game_online():
             return None
 
     while True:
-        statistics = requests.get(f"{utils.read_config('server_url')}/online/stats?user={user}&auth={auth}")
-        if response.status_code != 200:
+        statistics = utils.auth_get("/online/stats", user, auth)
+        if statistics.status_code != 200:
             elo = None
             print("Cannot get statistics")
         else:
@@ -271,10 +352,10 @@ def game_online():
         utils.clear_screen()
         print(f"Welcome to ranked, {user}!\n")
         print(f"Your ELO is {elo}\n")
-        print("P. Play\nL. Leaderboard\nS. Statistics\nC. Configuration\nX. Connection\nQ. Quit to lobby")
+        print("P. Play\nH. Play (hard mode)\nL. Leaderboard\nS. Statistics\nC. Configuration\nX. Connection\nQ. Quit to lobby")
         option = input("\nChoose the option you want...: ").upper()
-        if option == 'P':
-            result = game(user, auth, language)
+        if option in ('P', 'H'):
+            result = game(user, auth, language, option == 'H')
             if result[0] is not None:
                 letters, formatted_guesses, guess_number, decoded_guesses, game_status, game_time = result
                 utils.clear_screen()
@@ -286,7 +367,7 @@ def game_online():
                 print(f"Your guesses were:")
                 for i in decoded_guesses:
                     print(i)
-                print(f"The word was: {requests.get(f"{server}/online/word?user={user}&auth={auth}").text}")
+                print(f"The word was: {utils.auth_get('/online/word', user, auth).text}")
                 print(f"You had {len(letters)} letters remaining")
                 input("Press `Enter` to continue...")
         elif option == 'L':
@@ -1,7 +1,7 @@
 import random
 import utils
 import time
-from collections import Counter
+from shared import feedback
 
 def settings():
     utils.clear_screen()
@@ -16,31 +16,28 @@ def settings():
 
 
 def format_guess(guess, word):
-    if not guess or len(guess) != len(word):
+    pattern = feedback.score(guess, word)
+    if pattern is None:
         return None
 
     output = []
-    counts = Counter(word)
-    status = [0]*len(guess)
-
-    for i, char in enumerate(guess):
-        if char == word[i]:
-            status[i] = 2
-            counts[char] -= 1
-    for i, char in enumerate(guess):
-        if status[i] == 0 and counts[char] > 0:
-            status[i] = 1
-            counts[char] -= 1
-
-    for i, char in enumerate(guess):
-        if status[i] == 2:
+    for char, status in zip(guess, feedback.statuses(pattern, len(word))):
+        if status == feedback.GREEN:
             output.append(f"\033[92m{char}\033[0m")
-        elif status[i] == 1:
+        elif status == feedback.YELLOW:
             output.append(f"\033[93m{char}\033[0m")
         else:
             output.append(f"\033[91m{char}\033[0m")
     return "".join(output)
 
+# Prints the best next guesses for the words still possible
+def show_hints(language, guesses, word):
+    solver = utils.solver(language)
+    candidates = solver.candidates(guesses, [feedback.score(guess, word) for guess in guesses])
+    hints = solver.rank(candidates, 5)
+    print(f"{len(candidates)} possible words remaining")
+    print("Suggested guesses: " + ", ".join(f"{hint} ({bits:.2f} bits)" for hint, bits in hints))
+
 def game(word, tries, language):
     utils.clear_screen()
     print("Starting the game!")
@@ -65,7 +62,10 @@ def game(word, tries, language):
         print(f"\nRemaining guesses: {tries-len(guesses)}")
         print(f"Unused letters: {utils.format_unused_letters(letters)}")
 
-        guess = input(f"\nWrite your {utils.ordinal(len(guesses)+1)} guess: ").lower()
+        guess = input(f"\nWrite your {utils.ordinal(len(guesses)+1)} guess (? for a hint): ").lower()
+        while guess == "?":
+            show_hints(language, guesses, word)
+            guess = input(f"\nWrite your {utils.ordinal(len(guesses)+1)} guess: ").lower()
         if len(guess) == len(word) and guess in utils.wordlist(language):
             guesses.append(guess)
             if guess == word:
@@ -1,9 +1,8 @@
 import utils
-import requests
 
 # Fetches user statistics from the server
 def get_stats(user, auth):
-    response = requests.get(f"{utils.read_config('server_url')}/online/stats?user={user}&auth={auth}")
+    response = utils.auth_get("/online/stats", user, auth, {'limit': 10})
     if response.status_code != 200:
         print(f"Error fetching stats: {response.status_code} - {response.text}")
         return None, None, None, None, None, None
@@ -5,7 +5,7 @@ import datetime
 def get_word(language):
     random.seed(f"HackClub {datetime.date.today()}")
     solutions = utils.solutions(language)
-    return random.choice(solutions)
+    return random.choice(solutions).lower()
 
 def settings():
     utils.clear_screen()
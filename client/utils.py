@@ -1,7 +1,32 @@
 import json
 import os
 import hashlib
-import requests
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import api
+from shared import packed, patterns, solver as solvers
+
+_tokens = {}
+_solvers = {}
+_language_data = {}
+_config_cache = None
+_manifest = None
+
+# Language files downloaded at the same time while syncing
+SYNC_WORKERS = 4
+# Size of the chunks language downloads are read in
+DOWNLOAD_CHUNK = 64 * 1024
+# Read buffer used when hashing a file
+HASH_BUFFER = 1024 * 1024
+# Sidecar next to the hashed files with (size, mtime_ns, sha256) of each of them
+HASH_INDEX = '.hashes.json'
+_hash_indexes = {}
+_hash_lock = threading.Lock()
+# Read once at import, os.umask can only be read by setting it and downloads run in threads
+_umask = os.umask(0)
+os.umask(_umask)
 
 def ordinal(n):
     if 10 <= n % 100 <= 20:
@@ -13,36 +38,138 @@ def ordinal(n):
 def json_decode(param):
     return json.loads(param)
 
+# config.json is parsed again only when it changes on disk
+def _config():
+    global _config_cache
+    mtime_ns = os.stat('config.json').st_mtime_ns
+    if _config_cache is None or _config_cache[0] != mtime_ns:
+        with open('config.json') as config_file:
+            _config_cache = (mtime_ns, json.load(config_file))
+    return _config_cache[1]
+
 def read_config(param):
-    with open('config.json') as config_file:
-        config = json.load(config_file)
+    config = _config()
     if param in config:
         return config[param]
     else:
         return None
 
 def write_config(param, value):
+    global _config_cache
     with open('config.json') as config_file:
         config = json.load(config_file)
     config[param] = value
     with open('config.json', 'w') as config_file:
         json.dump(config, config_file)
+    _config_cache = None
+
+# Returns a session token for the account, logging in again shortly before it expires
+def session_token(user, auth):
+    server = read_config('server_url')
+    token, expires_at = _tokens.get((server, user, auth), (None, 0))
+    if time.time() < expires_at - 60:
+        return token
+    response = api.get("/online/login", {'user': user, 'auth': auth}, server=server)
+    if response.status_code != 200:
+        # Older servers have no login endpoint, don't ask again for a while
+        _tokens[(server, user, auth)] = (None, time.time() + 300)
+        return None
+    decoded = response.json()
+    _tokens[(server, user, auth)] = (decoded["token"], time.time() + decoded["expires_in"])
+    return decoded["token"]
+
+# Query parameters authenticating a request, preferring the session token over the password
+def auth_params(user, auth):
+    token = session_token(user, auth)
+    return {'token': token} if token else {'user': user, 'auth': auth}
+
+# Drops the cached token of an account, returns whether there was one
+def forget_token(user, auth):
+    key = (read_config('server_url'), user, auth)
+    if _tokens.get(key, (None, 0))[0] is None:
+        return False
+    del _tokens[key]
+    return True
+
+# Authenticated GET, preferring the session token
+# A token the server rejects (password changed elsewhere, server restarted, SECRET_KEY rotated) is dropped,
+# and the request is sent once more after logging in again
+def auth_get(path, user, auth, params=None, **kwargs):
+    response = api.get(path, {**auth_params(user, auth), **(params or {})}, **kwargs)
+    if response.status_code in (401, 403) and forget_token(user, auth):
+        response = api.get(path, {**auth_params(user, auth), **(params or {})}, **kwargs)
+    return response
 
 def languages():
     return sorted(set(
         filename.removesuffix('.json')
         for filename in os.listdir('../data')
-        if os.path.isfile(os.path.join('../data', filename))
+        if filename.endswith('.json') and not filename.startswith('.') and os.path.isfile(os.path.join('../data', filename))
     ))
 
+def language_path(language, online=False):
+    return f'../data/{"" if not online else "online/"}{language}.json'
+
+# Parses a language file once per session: wordlist as a set, solutions and their 5-letter filter as tuples
+# A packed file built by data_pack.py from the same JSON is mapped instead of reading it, its wordlist is searched in place
+# The packed header records the JSON's size and mtime, the JSON is hashed (via the sidecar index) only when they changed
+def language_data(language, online=False):
+    key = (language, online)
+    if key not in _language_data:
+        path = language_path(language, online)
+        packed_path = f'../packed/{language}.bin'
+        stat = os.stat(path)
+        packed_corpus = packed.load(packed_path, stat)
+        if packed_corpus is None:
+            sha256 = file_sha256(path)
+            packed_corpus = packed.load(packed_path, stat, sha256)
+        if packed_corpus is not None:
+            wordlist, raw_solutions, letters, sha256 = packed_corpus.wordlist, packed_corpus.solutions, packed_corpus.letters, packed_corpus.sha256
+        else:
+            with open(path, 'rb') as f:
+                data = json.loads(f.read())
+            wordlist, raw_solutions, letters = frozenset(data["wordlist"]), data["solutions"], data["letters"]
+        _language_data[key] = {
+            "wordlist": wordlist,
+            "solutions": tuple(raw_solutions),
+            "filtered": tuple(word.strip().lower() for word in raw_solutions if len(word.strip()) == 5),
+            "letters": tuple(letters),
+            "sha256": sha256,
+        }
+    return _language_data[key]
+
+# Drops everything derived from a language file after it has been replaced
+def invalidate_language(language, online=False):
+    _language_data.pop((language, online), None)
+    _solvers.pop((language, online), None)
+
 def wordlist(language, online=False):
-    return json.load(open(f'../data/{"" if not online else "online/"}{language}.json'))["wordlist"]
+    return language_data(language, online)["wordlist"]
 
 def solutions(language, online=False):
-    return json.load(open(f'../data/{"" if not online else "online/"}{language}.json'))["solutions"]
+    return language_data(language, online)["solutions"]
 
+# Returns a fresh list, games remove letters from it as they are used
 def letters(language, online=False):
-    return json.load(open(f'../data/{"" if not online else "online/"}{language}.json'))["letters"]
+    return list(language_data(language, online)["letters"])
+
+# Memory-mapped pattern matrix built by data_patterns.py, None if it is missing or outdated
+def pattern_matrix(language, online=False):
+    return patterns.load(f'../patterns/{language}.bin', language_data(language, online)["sha256"], wordlist(language, online), solutions(language, online))
+
+def solver(language, online=False):
+    if (language, online) not in _solvers:
+        _solvers[(language, online)] = solvers.Solver(letters(language, online), wordlist(language, online), solutions(language, online), pattern_matrix(language, online))
+    return _solvers[(language, online)]
+
+# Positional letter index over the wordlist and solutions
+def letter_index(language, online=False):
+    return solver(language, online).index
+
+# Words still consistent with the guesses and their per-letter statuses
+def possible_words(language, guesses, formatted_guesses, online=False, solutions_only=True):
+    index = letter_index(language, online)
+    return index.words_in(index.mask(guesses, formatted_guesses, solutions_only))
 
 # Sorts the remaining letters
 def format_unused_letters(letters):
@@ -52,13 +179,16 @@ def format_unused_letters(letters):
     return formatted_letters
 
 def filtered(language, length=5, online=False):
-    filtered_words = [word.strip().lower() for word in solutions(language, online) if len(word.strip()) == length]
+    if length == 5:
+        filtered_words = list(language_data(language, online)["filtered"])
+    else:
+        filtered_words = [word.strip().lower() for word in solutions(language, online) if len(word.strip()) == length]
     if not filtered_words:
         raise ValueError(f"No words found for {language} with length 5")
     return filtered_words
 
 def language_check(language):
-    request = requests.get(f"{read_config('server_url')}/online/languages/checksum?language={language}")
+    request = api.get("/online/languages/checksum", {'language': language})
     if request.status_code != 200:
         if request.status_code == 400:
             return "Language invalid"
@@ -71,23 +201,131 @@ def language_check(language):
         if download_status != "Local language file correct":
             return download_status
 
-    sha256 = hashlib.sha256()
-    with open(file_path, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            sha256.update(chunk)
-    if sha256.hexdigest() == request.text:
+    if file_sha256(file_path) == request.text:
         return "Local language file correct"
     return "Local language file invalid"
 
-def language_download(language):
-    download = requests.get(f"{read_config('server_url')}/online/languages/download?language={language}")
-    if download.status_code != 200:
-        if download.status_code == 400:
-            return "Language invalid"
+def _hash_file(path):
+    sha256 = hashlib.sha256()
+    buffer = bytearray(HASH_BUFFER)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            size = f.readinto(buffer)
+            if not size:
+                break
+            sha256.update(view[:size])
+    return sha256.hexdigest()
+
+# Renames a temporary file over path, with the permissions of the file it replaces or the umask default
+# mkstemp creates files readable by the owner only
+def _replace(temp_path, path):
+    try:
+        mode = os.stat(path).st_mode & 0o777
+    except FileNotFoundError:
+        mode = 0o666 & ~_umask
+    os.chmod(temp_path, mode)
+    os.replace(temp_path, path)
+
+def _hash_index(directory):
+    if directory not in _hash_indexes:
+        try:
+            with open(os.path.join(directory, HASH_INDEX)) as index_file:
+                _hash_indexes[directory] = json.load(index_file)
+        except (OSError, ValueError):
+            _hash_indexes[directory] = {}
+    return _hash_indexes[directory]
+
+def _write_hash_index(directory):
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=HASH_INDEX, suffix='.tmp')
+    with os.fdopen(fd, 'w') as index_file:
+        json.dump(_hash_indexes[directory], index_file)
+    _replace(temp_path, os.path.join(directory, HASH_INDEX))
+
+# Stores the hash of a file that was just written, with its current size and mtime
+def _record_sha256(path, sha256, stat=None):
+    stat = stat or os.stat(path)
+    directory, name = os.path.split(path)
+    with _hash_lock:
+        _hash_index(directory)[name] = [stat.st_size, stat.st_mtime_ns, sha256]
+        _write_hash_index(directory)
+
+# sha256 of a file, hashed again only when its size or mtime changed since it was last hashed
+def file_sha256(path):
+    stat = os.stat(path)
+    directory, name = os.path.split(path)
+    with _hash_lock:
+        entry = _hash_index(directory).get(name)
+    if entry and entry[:2] == [stat.st_size, stat.st_mtime_ns]:
+        return entry[2]
+    sha256 = _hash_file(path)
+    _record_sha256(path, sha256, stat)
+    return sha256
+
+# {language: {sha256, size, version}} of every language on the server, None if the server has no manifest
+# The last manifest is kept with its ETag, so an unchanged one costs a 304 without a body
+def language_manifest():
+    global _manifest
+    server = read_config('server_url')
+    headers = {'If-None-Match': _manifest[1]} if _manifest and _manifest[0] == server else {}
+    response = api.get("/online/languages/manifest", headers=headers)
+    if response.status_code == 304:
+        return _manifest[2]
+    if response.status_code != 200:
+        return None
+    languages = response.json()["languages"]
+    _manifest = (server, response.headers.get('ETag'), languages)
+    return languages
+
+# Compares the local files with the manifest and downloads only the changed ones, several at a time
+def language_sync(manifest):
+    status = {}
+    changed = []
+    for language, entry in manifest.items():
+        path = language_path(language, True)
+        if os.path.isfile(path) and file_sha256(path) == entry["sha256"]:
+            status[language] = "Local language file correct"
         else:
-            return "Download error"
-    with open(f'../data/online/{language}.json', 'w', encoding='utf-8') as out:
-        json.dump(json.loads(download.text), out, ensure_ascii=False, indent=2)
+            changed.append(language)
+    if changed:
+        with ThreadPoolExecutor(max_workers=min(SYNC_WORKERS, len(changed))) as executor:
+            downloads = executor.map(lambda language: language_download(language, manifest[language]["sha256"]), changed)
+            for language, result in zip(changed, downloads):
+                status[language] = result
+    return {language: status[language] for language in manifest}
+
+# Streams the server's copy of a language file to a temporary file and renames it over the local one
+# The bytes are kept exactly as served, so the local hash matches the server's checksum, and they are verified while downloading
+def language_download(language, sha256=None):
+    path = language_path(language, True)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    headers = {'If-None-Match': f'"{file_sha256(path)}"'} if os.path.isfile(path) else {}
+    with api.get("/online/languages/download", {'language': language}, headers=headers, stream=True) as download:
+        if download.status_code == 304:
+            return "Local language file correct"
+        if download.status_code != 200:
+            if download.status_code == 400:
+                return "Language invalid"
+            else:
+                return "Download error"
+        expected = sha256 or download.headers.get('ETag', '').removeprefix('W/').strip('"')
+        digest = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f'.{language}.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                for chunk in download.iter_content(DOWNLOAD_CHUNK):
+                    digest.update(chunk)
+                    out.write(chunk)
+            if expected and digest.hexdigest() != expected:
+                os.remove(temp_path)
+                return "Download error"
+            _replace(temp_path, path)
+            _record_sha256(path, digest.hexdigest())
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+    invalidate_language(language, True)
     return "Local language file correct"
 
 def clear_screen():
@@ -0,0 +1,25 @@
+import hashlib
+import json
+import os
+from shared import packed
+
+OUTPUT_DIR = 'packed'
+
+def languages():
+    return sorted(set(filename.removesuffix('.json') for filename in os.listdir('data') if filename.endswith('.json') and not filename.startswith('.')))
+
+# Builds packed/<lang>.bin for every language whose packed corpus is missing or outdated
+os.makedirs(OUTPUT_DIR, exist_ok=True)
+for lang in languages():
+    with open(f'data/{lang}.json', 'rb') as f:
+        stat = os.fstat(f.fileno())
+        raw = f.read()
+    sha256 = hashlib.sha256(raw).hexdigest()
+    path = os.path.join(OUTPUT_DIR, f'{lang}.bin')
+    # Rebuilt when the recorded size and mtime are stale too, so loading it doesn't fall back to hashing the JSON
+    packed_corpus = packed.load(path, stat)
+    if packed_corpus is not None and packed_corpus.sha256 == sha256:
+        print(f"{lang}: up to date")
+        continue
+    words, solutions = packed.build(path, sha256, stat, lang, json.loads(raw))
+    print(f"{lang}: {words} words, {solutions} solutions, {os.path.getsize(path)} bytes")
@@ -0,0 +1,23 @@
+import hashlib
+import json
+import os
+from shared import patterns
+
+OUTPUT_DIR = 'patterns'
+
+def languages():
+    return sorted(set(filename.removesuffix('.json') for filename in os.listdir('data') if filename.endswith('.json') and not filename.startswith('.')))
+
+# Builds patterns/<lang>.bin for every language whose matrix is missing or outdated
+os.makedirs(OUTPUT_DIR, exist_ok=True)
+for lang in languages():
+    with open(f'data/{lang}.json', 'rb') as f:
+        raw = f.read()
+    data = json.loads(raw)
+    sha256 = hashlib.sha256(raw).hexdigest()
+    path = os.path.join(OUTPUT_DIR, f'{lang}.bin')
+    if patterns.load(path, sha256, data["wordlist"], data["solutions"]) is not None:
+        print(f"{lang}: up to date")
+        continue
+    guesses, solutions = patterns.build(path, sha256, data["letters"], data["wordlist"], data["solutions"])
+    print(f"{lang}: {guesses} guesses x {solutions} solutions")
@@ -0,0 +1,161 @@
+import json
+import logging
+import os
+import threading
+import requests
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from openai import OpenAI
+
+# Seconds a single model request may take
+TIMEOUT = 60
+
+PUZZLE_PROMPT = '''
+                    Provide a single 5-character {language} word suitable as an answer for a Wordle-style game.
+                    Provide a full letter list for {language} language like a,b,c etc.
+                    Provide a row list for keyboard for {language} language.
+                    Reply with a JSON object only, no extra text. Example format for English:
+                    {{"word":"apple","letters":["Q","W","E","R","T","Y","U","I","O","P","A","S","D","F","G","H","J","K","L","Z","X","C","V","B","N","M"],"rows":[["Q","W","E","R","T","Y","U","I","O","P"],["A","S","D","F","G","H","J","K","L"],["ENTER","Z","X","C","V","B","N","M","BACKSPACE"]]}}
+                    Return the JSON object exactly as shown.
+                    Do not use tags like ```json.
+                    '''
+
+_client = None
+
+# One OpenAI client per process, so requests and background generations share its connection pool
+def client():
+    global _client
+    if _client is None:
+        _client = OpenAI(
+            api_key=os.environ.get("AI_KEY", ""),
+            base_url=os.environ.get("AI_URL", ""),
+            timeout=TIMEOUT
+        )
+    return _client
+
+# Ids of the models offered by the provider
+def fetch_models(url):
+    response = requests.get(
+        url=f"{url}/models",
+        headers={"Authorization": f"Bearer {os.environ.get("AI_KEY", "")}"},
+        timeout=TIMEOUT
+    )
+    response.raise_for_status()
+    return [model["id"] for model in response.json()["data"]]
+
+# Parses a model reply into {word, letters, rows}, raising ValueError if it is not a usable puzzle
+def parse_puzzle(content):
+    try:
+        puzzle = json.loads(str(content))
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Reply is not JSON: {e}")
+    if not isinstance(puzzle, dict):
+        raise ValueError("Reply is not a JSON object")
+    word, letters, rows = puzzle.get("word"), puzzle.get("letters"), puzzle.get("rows")
+    if not isinstance(word, str) or len(word.strip()) != 5:
+        raise ValueError("Word must be a 5-character string")
+    if not isinstance(letters, list) or not letters or not all(isinstance(letter, str) for letter in letters):
+        raise ValueError("Letters must be a list of strings")
+    if not isinstance(rows, list) or not all(isinstance(row, list) and all(isinstance(key, str) for key in row) for row in rows):
+        raise ValueError("Rows must be a list of lists of strings")
+    return {"word": word.strip(), "letters": letters, "rows": rows}
+
+# Asks the model for a new puzzle
+def generate_puzzle(client, model, language):
+    response = client.chat.completions.create(
+        model=model,
+        messages=[
+            {"role": "system", "content": "You are a wordle game provider"},
+            {"role": "user", "content": PUZZLE_PROMPT.format(language=language)}
+        ]
+    )
+    return parse_puzzle(response.choices[0].message.content)
+
+# Asks the model whether a guess is a real word
+def check_word(client, model, language, word):
+    response = client.chat.completions.create(
+        model=model,
+        messages=[
+            {"role": "system", "content": "You are a wordle game provider."},
+            {"role": "user", "content": f"Check if the word '{word}' is a correct 5-character word in {language} for a Wordle-style game. Reply with only True or False and no additional text."}
+        ]
+    )
+    return str(response.choices[0].message.content).strip().lower() == "true"
+
+# Bounded queues of ready puzzles per (model, language), refilled in the background
+# A pool is created only after a puzzle for its key was generated on demand, so unknown models are never prefetched
+# Every worker process keeps its own pools
+class PuzzlePool:
+    def __init__(self, generate, size, workers, max_pools=32):
+        # generate(model, language) -> puzzle, size() -> queue length, workers() -> concurrent generations
+        self.generate = generate
+        self.size = size
+        self.workers = workers
+        self.max_pools = max_pools
+        self.lock = threading.Lock()
+        # (model, language) -> deque of puzzles, least recently used first
+        self.pools = OrderedDict()
+        self.pending = {}
+        self.executor = None
+        self.executor_workers = 0
+
+    def _executor(self):
+        workers = max(1, self.workers())
+        if self.executor is None or self.executor_workers != workers:
+            if self.executor is not None:
+                self.executor.shutdown(wait=False)
+            self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='puzzle-pool')
+            self.executor_workers = workers
+        return self.executor
+
+    # Schedules enough generations to fill the queue, counting the ones already running
+    def _refill(self, key):
+        missing = self.size() - len(self.pools[key]) - self.pending.get(key, 0)
+        if missing <= 0:
+            return
+        executor = self._executor()
+        self.pending[key] = self.pending.get(key, 0) + missing
+        for _ in range(missing):
+            executor.submit(self._produce, key)
+
+    def _produce(self, key):
+        try:
+            puzzle = self.generate(*key)
+        except Exception as e:
+            puzzle = None
+            logging.warning(f"Failed to pre-generate a puzzle for {key[0]} ({key[1]}): {e}")
+        with self.lock:
+            self.pending[key] -= 1
+            if not self.pending[key]:
+                del self.pending[key]
+            if key in self.pools and puzzle is not None:
+                self.pools[key].append(puzzle)
+
+    def _pool(self, key):
+        if key not in self.pools:
+            self.pools[key] = deque(maxlen=max(1, self.size()))
+            if len(self.pools) > self.max_pools:
+                self.pools.popitem(last=False)
+        self.pools.move_to_end(key)
+        return self.pools[key]
+
+    # A ready puzzle, or one generated now when the queue is empty
+    def get(self, model, language):
+        key = (model, language)
+        with self.lock:
+            pool = self.pools.get(key)
+            if pool:
+                self.pools.move_to_end(key)
+                puzzle = pool.popleft()
+                self._refill(key)
+                return puzzle
+        puzzle = self.generate(model, language)
+        with self.lock:
+            self._pool(key)
+            self._refill(key)
+        return puzzle
+
+    # [(model, language, ready puzzles, generations running)]
+    def depths(self):
+        with self.lock:
+            return [(model, language, len(pool), self.pending.get((model, language), 0)) for (model, language), pool in self.pools.items()]
@@ -1,5 +1,4 @@
 # Imports
-import hashlib
 from flask import Flask, render_template, request, send_from_directory
 from flask_sqlalchemy import SQLAlchemy
 import os
@@ -8,17 +7,22 @@ from flask import jsonify
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects import postgresql, sqlite
 try:
-    from . import utils, online
+    from . import utils, online, corpus, sessions, migrations, gamestate, ai
+    from .leaderboard import Leaderboard, METRICS as LEADERBOARD_METRICS
+    from .heavyhitters import MostGuessed
 except Exception:
-    import utils, online
+    import utils, online, corpus, sessions, migrations, gamestate, ai
+    from leaderboard import Leaderboard, METRICS as LEADERBOARD_METRICS
+    from heavyhitters import MostGuessed
+from shared import wordcheck, catalogue
 from werkzeug.security import generate_password_hash, check_password_hash
 import datetime
-from sqlalchemy.ext.mutable import MutableDict
+from collections import Counter
+import threading
 import json
 import logging
-from openai import OpenAI
-import requests
 
 # Initialization
 logging.basicConfig(level=logging.INFO)
@@ -41,35 +45,101 @@ class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), index=True, unique=True, nullable=False)
     auth = db.Column(db.String(256), nullable=False)
+    # Latest game started by the user, so guesses resolve their game by primary key
+    active_game_id = db.Column(db.Integer, nullable=True)
 
 # Game DB
 class Game(db.Model):
     game_id = db.Column(db.Integer, primary_key=True)
-    username = db.Column(db.String(80), index=True, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), index=True, nullable=False)
     language = db.Column(db.String(80), nullable=False)
     start_time = db.Column(db.DateTime, nullable=False)
     word = db.Column(db.String(5), nullable=True)
-    guesses = db.Column(db.JSON, nullable=True)
-    formatted_guesses = db.Column(db.JSON, nullable=True)
-    letters = db.Column(db.JSON, nullable=True)
+    # Compact game state, see gamestate.py
+    guess_string = db.Column(db.String(80), nullable=True)
+    patterns = db.Column(db.BigInteger, nullable=True)
+    unused_letters = db.Column(db.BigInteger, nullable=True)
     guess_number = db.Column(db.Integer, nullable=True)
     time = db.Column(db.Float, nullable=True)
     status = db.Column(db.Integer, nullable=True)
+    hard_mode = db.Column(db.Boolean, nullable=False, default=False)
+    constraints = db.Column(db.JSON, nullable=True)
+
+    # Decoded views of the compact state, in the shape the API returns
+    @property
+    def guesses(self):
+        return gamestate.split_guesses(self.guess_string, len(self.word))
+
+    @property
+    def formatted_guesses(self):
+        return gamestate.formatted_guesses(self.patterns, self.guess_number or 0, len(self.word))
+
+    @property
+    def letters(self):
+        return gamestate.mask_letters(self.unused_letters, utils.letters(self.language))
 
 # Stats DB
 class Stats(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    username = db.Column(db.String(80), index=True, nullable=False)
-    points = db.Column(db.Integer, nullable=True)
-    matches = db.Column(db.Integer, nullable=True)
-    wins = db.Column(db.Integer, nullable=True)
-    avg_time = db.Column(db.Float, nullable=True)
-    word_freq = db.Column(MutableDict.as_mutable(db.JSON), nullable=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), index=True, unique=True, nullable=False)
+    points = db.Column(db.Integer, index=True, nullable=True)
+    matches = db.Column(db.Integer, index=True, nullable=True)
+    wins = db.Column(db.Integer, index=True, nullable=True)
+    avg_time = db.Column(db.Float, index=True, nullable=True)
+    winrate = db.Column(db.Float, index=True, nullable=True)
     registered_on = db.Column(db.DateTime, nullable=False)
+    user = db.relationship('User')
+
+    # The username lives only on the user row, so renames touch one row
+    @property
+    def username(self):
+        return self.user.username
 
-# DB Creation
+# Word frequency DB, one row per user and guessed word
+class WordFreq(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), primary_key=True)
+    word = db.Column(db.String(80), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    __table_args__ = (db.Index('ix_word_freq_user_id_count', 'user_id', 'count'),)
+
+# DB Creation, one worker at a time
 with app.app_context():
-    db.create_all()
+    migrations.run(db)
+
+if not sessions.enabled():
+    logging.warning("SECRET_KEY is not set, session tokens are disabled and clients authenticate with user and auth")
+
+# Language data preload
+corpus.load_all()
+# PREPARE_HINTS=False skips ranking the openings in the background, i.e. for benchmarks
+if os.environ.get('PREPARE_HINTS', 'True').lower() == 'true':
+    threading.Thread(target=online.prepare_hints, daemon=True).start()
+
+# Resolves the requesting user from a session token, falling back to the user/auth parameters
+# Returns (user, None) on success or (None, (message, status)) on failure
+def authenticate(missing_status=400):
+    token = (request.args.get('token') or '').strip()
+    if token:
+        payload = sessions.verify(token, utils.config().session_ttl)
+        if not payload:
+            return None, ('Invalid token', 403)
+        existing_user = db.session.get(User, payload['id'])
+        if not sessions.matches(payload, existing_user):
+            return None, ('Invalid token', 403)
+        return existing_user, None
+
+    user = (request.args.get('user') or '').strip()
+    auth = (request.args.get('auth') or '').strip()
+
+    if not user or not auth:
+        return None, ('Missing required parameters: user and auth', missing_status)
+
+    existing_user = User.query.filter_by(username=user).first()
+    if not existing_user:
+        return None, ('User not found', 401)
+    if not check_password_hash(existing_user.auth, auth):
+        return None, ('Wrong auth', 403)
+    return existing_user, None
 
 # TODO: Landing page
 @app.route('/')
@@ -83,8 +153,12 @@ def server_check():
 
 # User auth check
 @app.route('/online/auth_check')
-@limiter.limit(utils.read_config('rate_limit_auth_per_ip'), key_func=get_remote_address)
+@limiter.limit(utils.rate_limit('rate_limit_auth_per_ip'), key_func=get_remote_address)
 def auth_check():
+    if request.args.get('token'):
+        existing_user, error = authenticate()
+        return error if error else ("Authenticated", 200)
+
     user = (request.args.get('user') or '').strip()
     auth = (request.args.get('auth') or '').strip()
 
@@ -99,9 +173,34 @@ def auth_check():
             return "Invalid auth", 403
     return 'Invalid details', 401
 
+# Session login endpoint
+# Verifies the password once and issues a signed token accepted by the /online/* and /ai/* routes
+@app.route('/online/login')
+@limiter.limit(utils.rate_limit('rate_limit_auth_per_ip'), key_func=get_remote_address)
+def login():
+    user = (request.args.get('user') or '').strip()
+    auth = (request.args.get('auth') or '').strip()
+
+    if not user or not auth:
+        return 'Missing required parameters: user and auth', 400
+    # Clients fall back to user and auth, like on servers without this endpoint
+    if not sessions.enabled():
+        return 'Session tokens are disabled on this server', 404
+
+    existing_user = User.query.filter_by(username=user).first()
+    if not existing_user:
+        return 'User not found', 401
+    if not check_password_hash(existing_user.auth, auth):
+        return 'Wrong auth', 403
+
+    return jsonify({
+        'token': sessions.issue(existing_user),
+        'expires_in': utils.config().session_ttl
+    })
+
 # User existence check
 @app.route('/online/user_check/<username>')
-@limiter.limit(utils.read_config('rate_limit_check_per_ip'), key_func=get_remote_address)
+@limiter.limit(utils.rate_limit('rate_limit_check_per_ip'), key_func=get_remote_address)
 def user_check(username):
     username = (username or '').strip()
     user = User.query.filter_by(username=username).first()
@@ -110,117 +209,143 @@ def user_check(username):
     else:
         return 'User not found', 404
 
+def load_leaderboard():
+    return db.session.query(Stats.id, User.username, Stats.points, Stats.matches, Stats.wins, Stats.avg_time).join(User, Stats.user_id == User.id).all()
+
+leaderboard_cache = Leaderboard(load_leaderboard, lambda: utils.config().leaderboard_ttl)
+
+def top_lists():
+    return {f'top_{metric}': [{'username': username, metric: value} for username, value in leaderboard_cache.top(metric)] for metric in LEADERBOARD_METRICS}
+
 # Backend leaderboard endpoint
 @app.route('/online/leaderboard')
-@limiter.limit(utils.read_config('rate_limit_leaderboard_per_ip'), key_func=get_remote_address)
+@limiter.limit(utils.rate_limit('rate_limit_leaderboard_per_ip'), key_func=get_remote_address)
 def get_leaderboard():
     state = request.args.get('state')
     if not state:
         return 'Missing required parameter: state', 400
 
-    top_points = Stats.query.filter(Stats.matches > 0).order_by(Stats.points.desc()).limit(10).all()
-    top_matches = Stats.query.filter(Stats.matches > 0).order_by(Stats.matches.desc()).limit(10).all()
-    top_avg_time = Stats.query.filter(Stats.avg_time > 0, Stats.matches >= 10).order_by(Stats.avg_time.asc()).limit(10).all()
-    top_winrate = Stats.query.filter(Stats.matches >= 10).all()
-    top_winrate = sorted(top_winrate, key=lambda s: s.wins / s.matches if s.matches >= 10 else 0, reverse=True)[:10]
-    top_wins = Stats.query.filter(Stats.wins > 0).order_by(Stats.wins.desc()).limit(10).all()
-
-    if state == "basic" or state == "user":
-        user = (request.args.get('user') or '').strip()
-        auth = (request.args.get('auth') or '').strip()
-
-        if not user or not auth:
-            return 'Missing required parameters: user and auth', 400
-
-        existing_user = User.query.filter_by(username=user).first()
-        if not existing_user:
-            return 'User not found', 401
-
-        if not check_password_hash(existing_user.auth, auth):
-            return 'Wrong auth', 403
-
-        user_stats = Stats.query.filter_by(username=user).first()
-        points_position = None if Stats.query.filter(Stats.points > user_stats.points, Stats.matches > 0).count() == 0 else Stats.query.filter(Stats.points > user_stats.points, Stats.matches > 0).count() + 1
-        matches_position = None if Stats.query.filter(Stats.matches > user_stats.matches, Stats.matches > 0).count() == 0 else Stats.query.filter(Stats.matches > user_stats.matches, Stats.matches > 0).count() + 1
-        wins_position = None if Stats.query.filter(Stats.wins > user_stats.wins, Stats.wins > 0).count() == 0 else Stats.query.filter(Stats.wins > user_stats.wins, Stats.matches > 0).count() + 1
-        avg_time_position = Stats.query.filter(
-            Stats.avg_time > 0,
-            Stats.avg_time < user_stats.avg_time,
-            Stats.matches >= 10
-        ).count() + 1 if user_stats.avg_time > 0 and user_stats.matches >= 10 else None
-
-        user_winrate = user_stats.wins / user_stats.matches if user_stats.matches > 0 else 0
-        winrate_position = Stats.query.filter(Stats.matches >= 10).all()
-        winrate_position =  None if sum(1 for s in winrate_position if (s.wins / s.matches) > user_winrate) == 0 else sum(1 for s in winrate_position if (s.wins / s.matches) > user_winrate) + 1
+    if state == "basic" or state == "user" or state == "neighbours":
+        existing_user, error = authenticate()
+        if error:
+            return error
+        user = existing_user.username
+
+        user_stats = leaderboard_cache.player(user) or Stats.query.filter_by(user_id=existing_user.id).first()
+        positions = {metric: leaderboard_cache.ahead(metric, user_stats) for metric in LEADERBOARD_METRICS}
+        user_position = {
+            'points': positions['points'] + 1 if positions['points'] else None,
+            'matches': positions['matches'] + 1 if positions['matches'] else None,
+            'avg_time': positions['avg_time'] + 1 if user_stats.avg_time > 0 and user_stats.matches >= 10 else None,
+            'winrate': positions['winrate'] + 1 if positions['winrate'] else None,
+            'wins': positions['wins'] + 1 if positions['wins'] else None
+        }
 
         if state == "basic":
             return jsonify({
-                'top_points': [{'username': s.username, 'points': s.points} for s in top_points],
-                'top_matches': [{'username': s.username, 'matches': s.matches} for s in top_matches],
-                'top_avg_time': [{'username': s.username, 'avg_time': s.avg_time} for s in top_avg_time],
-                'top_winrate': [{'username': s.username, 'winrate': s.wins / s.matches if s.matches > 0 else 0} for s in top_winrate],
-                'top_wins': [{'username': s.username, 'wins': s.wins} for s in top_wins],
-                'user_position': {
-                    'points': points_position,
-                    'matches': matches_position,
-                    'avg_time': avg_time_position,
-                    'winrate': winrate_position,
-                    'wins': wins_position
-                }
+                **top_lists(),
+                'user_position': user_position
             })
         elif state == "user":
             return jsonify({
-                'user_position': {
-                    'points': points_position,
-                    'matches': matches_position,
-                    'avg_time': avg_time_position,
-                    'winrate': winrate_position,
-                    'wins': wins_position
-                }
+                'user_position': user_position
+            })
+        elif state == "neighbours":
+            metric = request.args.get('metric') or 'points'
+            if metric not in LEADERBOARD_METRICS:
+                return 'Invalid metric', 400
+            try:
+                n = min(max(int(request.args.get('n') or 5), 0), 50)
+            except ValueError:
+                return 'Invalid n', 400
+            return jsonify({
+                'metric': metric,
+                'neighbours': [{'rank': rank, 'username': username, metric: value} for rank, username, value in leaderboard_cache.neighbours(metric, user, n)],
+                'user_position': user_position
             })
 
     elif state == 'global':
-        return jsonify({
-            'top_points': [{'username': s.username, 'points': s.points} for s in top_points],
-            'top_matches': [{'username': s.username, 'matches': s.matches} for s in top_matches],
-            'top_avg_time': [{'username': s.username, 'avg_time': s.avg_time} for s in top_avg_time],
-            'top_winrate': [{'username': s.username, 'winrate': s.wins / s.matches if s.matches > 0 else 0} for s in top_winrate],
-            'top_wins': [{'username': s.username, 'wins': s.wins} for s in top_wins]
-        })
+        return jsonify(top_lists())
 
     return "Wrong state", 404
 
 # Backend stats endpoint
 @app.route('/online/stats')
-@limiter.limit(utils.read_config('rate_limit_stats_per_ip'), key_func=get_remote_address)
+@limiter.limit(utils.rate_limit('rate_limit_stats_per_ip'), key_func=get_remote_address)
 def get_stats():
-    user = (request.args.get('user') or '').strip()
-    auth = (request.args.get('auth') or '').strip()
-
-    if not user or not auth:
-        return 'Missing required parameters: user and auth', 400
-
-    existing_user = User.query.filter_by(username=user).first()
-    if not existing_user:
-        return 'User not found', 401
-
-    if not check_password_hash(existing_user.auth, auth):
-        return 'Wrong auth', 403
-
-    stats = Stats.query.filter_by(username=user).first()
+    existing_user, error = authenticate()
+    if error:
+        return error
+    stats = Stats.query.filter_by(user_id=existing_user.id).first()
     if not stats:
         return 'Stats not found', 404
 
+    try:
+        limit = int(request.args.get('limit')) if request.args.get('limit') else None
+    except ValueError:
+        return 'Invalid limit', 400
+    if limit is not None and limit < 0:
+        return 'Invalid limit', 400
+
+    # Most used words first, all of them unless a limit is given
+    word_freq = WordFreq.query.filter_by(user_id=existing_user.id).order_by(WordFreq.count.desc(), WordFreq.word)
+    if limit is not None:
+        word_freq = word_freq.limit(limit)
+
     return jsonify({
         'username': stats.username,
         'points': stats.points,
         'matches': stats.matches,
         'wins': stats.wins,
         'avg_time': stats.avg_time,
-        'word_freq': stats.word_freq,
+        'word_freq': {row.word: row.count for row in word_freq},
         'registered_on': stats.registered_on
     })
 
+def load_most_guessed(limit):
+    total = db.func.sum(WordFreq.count)
+    return db.session.query(WordFreq.word, total).group_by(WordFreq.word).order_by(total.desc(), WordFreq.word).limit(limit).all()
+
+most_guessed = MostGuessed(load_most_guessed, lambda: utils.config().leaderboard_ttl)
+
+# Most guessed words across all players
+@app.route('/online/most_guessed')
+@limiter.limit(utils.rate_limit('rate_limit_leaderboard_per_ip'), key_func=get_remote_address)
+def get_most_guessed():
+    try:
+        limit = min(max(int(request.args.get('limit') or 10), 1), 100)
+    except ValueError:
+        return 'Invalid limit', 400
+
+    return jsonify({
+        'words': [{'word': word, 'count': count} for word, count, error in most_guessed.top(limit)]
+    })
+
+# Adds a finished game's guesses to the player's word counts with one upsert
+# Returns the counts so the caller can update the global summary after committing
+def record_word_freq(user_id, guesses):
+    counts = Counter(guess for guess in guesses if isinstance(guess, str) and len(guess) <= 5)
+    if not counts:
+        return counts
+    rows = [{'user_id': user_id, 'word': word, 'count': count} for word, count in counts.items()]
+    dialect = db.engine.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        statement = insert(WordFreq).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=['user_id', 'word'],
+            set_={'count': WordFreq.count + statement.excluded['count']}
+        )
+        db.session.execute(statement)
+    else:
+        for row in rows:
+            existing = db.session.get(WordFreq, (user_id, row['word']))
+            if existing:
+                existing.count += row['count']
+            else:
+                db.session.add(WordFreq(**row))
+    return counts
+
 @app.route('/online/version')
 def get_version():
     with open("data.json", "r", encoding="utf-8") as f:
@@ -230,21 +355,18 @@ def get_version():
 # ELO calculation system
 # You can customize it in config.json
 def update_elo(current_elo, won):
-    system_elo = utils.read_config("base_elo")
-    win_bonus = utils.read_config("win_bonus")
-    k_win = utils.read_config("k_win")
-    k_loss = utils.read_config("k_loss")
-    expected_score = 1 / (1 + 10 ** ((system_elo - current_elo) / 400))
+    config = utils.config()
+    expected_score = 1 / (1 + 10 ** ((config.base_elo - current_elo) / 400))
     actual_score = 1 if won else 0
-    k = k_win if won else k_loss
+    k = config.k_win if won else config.k_loss
     new_elo = int(current_elo + k * (actual_score - expected_score))
     if won:
-        new_elo += win_bonus
+        new_elo += config.win_bonus
     return max(new_elo, 0)
 
 # User creation endpoint
 @app.route('/online/create_user')
-@limiter.limit(utils.read_config('rate_limit_create_per_ip'), key_func=get_remote_address)
+@limiter.limit(utils.rate_limit('rate_limit_create_per_ip'), key_func=get_remote_address)
 def create_user():
     user = (request.args.get('user') or '').strip()
     auth = (request.args.get('auth') or '').strip()
@@ -285,7 +407,7 @@ def fn_create_user(user, auth):
         return 3
 
     user_table = User(username=user, auth=generate_password_hash(auth))
-    stats = Stats(username=user, points=utils.read_config("base_elo"), matches=0, wins=0, avg_time=0, word_freq={}, registered_on=datetime.datetime.now())
+    stats = Stats(user=user_table, points=utils.read_config("base_elo"), matches=0, wins=0, avg_time=0, winrate=0, registered_on=datetime.datetime.now())
     try:
         db.session.add(user_table)
         db.session.add(stats)
@@ -293,10 +415,11 @@ def fn_create_user(user, auth):
     except IntegrityError:
         db.session.rollback()
         return -1
+    leaderboard_cache.record(stats)
     return 0
 
 @app.route('/online/delete_account')
-@limiter.limit(utils.read_config('rate_limit_delete_user_per_ip'), key_func=get_remote_address)
+@limiter.limit(utils.rate_limit('rate_limit_delete_user_per_ip'), key_func=get_remote_address)
 def delete_account():
     user = (request.args.get('user') or '').strip()
     auth = (request.args.get('auth') or '').strip()
@@ -313,17 +436,19 @@ def delete_account():
 
     db.session.begin_nested()
     try:
-        User.query.filter_by(username=user).delete(synchronize_session='auto')
-        Game.query.filter_by(username=user).delete(synchronize_session='auto')
-        Stats.query.filter_by(username=user).delete(synchronize_session='auto')
+        WordFreq.query.filter_by(user_id=existing_user.id).delete(synchronize_session='auto')
+        Game.query.filter_by(user_id=existing_user.id).delete(synchronize_session='auto')
+        Stats.query.filter_by(user_id=existing_user.id).delete(synchronize_session='auto')
+        User.query.filter_by(id=existing_user.id).delete(synchronize_session='auto')
         db.session.commit()
     except IntegrityError:
         db.session.rollback()
         return "Failed to delete the account", 400
+    leaderboard_cache.remove(user)
     return "Deleted the account successfully", 200
 
 @app.route('/online/change_data/<option>')
-@limiter.limit(utils.read_config('rate_limit_change_data_per_ip'), key_func=get_remote_address)
+@limiter.limit(utils.rate_limit('rate_limit_change_data_per_ip'), key_func=get_remote_address)
 def change_data(option):
     user = (request.args.get('user') or '').strip()
     auth = (request.args.get('auth') or '').strip()
@@ -366,13 +491,12 @@ def change_data(option):
 
         db.session.begin_nested()
         try:
-            Game.query.filter_by(username=user).update({'username': new_user}, synchronize_session='auto')
-            Stats.query.filter_by(username=user).update({'username': new_user}, synchronize_session='auto')
             existing_user.username = new_user
             db.session.commit()
         except IntegrityError:
             db.session.rollback()
             return "Failed to change the username", 400
+        leaderboard_cache.rename(user, new_user)
         return "Changed the username successfully", 200
 
     if option == 'auth':
@@ -427,11 +551,15 @@ def languages_checksum():
     if not language or language not in utils.languages():
         return 'Language invalid', 400
 
-    sha256 = hashlib.sha256()
-    with open(f'data/{language}.json', "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            sha256.update(chunk)
-    return sha256.hexdigest()
+    return utils.checksum(language)
+
+# Every language's hash, size and version in one request, so clients sync with a single round trip
+@app.route('/online/languages/manifest')
+def languages_manifest():
+    body, etag = utils.manifest()
+    response = jsonify(languages=body)
+    response.set_etag(etag)
+    return response.make_conditional(request)
 
 @app.route('/online/languages/download')
 def languages_download():
@@ -440,240 +568,334 @@ def languages_download():
     if not language or language not in utils.languages():
         return 'Language invalid', 400
 
-    return open(f'data/{language}.json')
+    sha256, raw, compressed = utils.download(language)
+    gzipped = 'gzip' in request.accept_encodings
+    body = compressed if gzipped else raw
+    response = app.response_class((body[i:i + utils.DOWNLOAD_CHUNK] for i in range(0, len(body), utils.DOWNLOAD_CHUNK)), mimetype='application/json')
+    response.content_length = len(body)
+    if gzipped:
+        response.content_encoding = 'gzip'
+    response.vary.add('Accept-Encoding')
+    # Weak since the gzip and plain bodies carry the same file, clients send back the hash of their copy
+    response.set_etag(sha256, weak=True)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+# Latest game of a user, through the pointer on the user row authentication already loaded
+def current_game(user):
+    if user.active_game_id is None:
+        return None
+    return db.session.get(Game, user.active_game_id)
+
+# Creates a game and makes it the user's current one
+def new_game(existing_user, language, hard_mode=False):
+    word = online.generate_word(language)
+    game = Game(user_id=existing_user.id, word=word, language=language, time=0, status=1, guess_string='', patterns=0, guess_number=0, unused_letters=gamestate.full_mask(utils.letters(language)), start_time=datetime.datetime.now(), hard_mode=hard_mode, constraints=online.hard_mode_state() if hard_mode else None)
+    db.session.add(game)
+    db.session.flush()
+    existing_user.active_game_id = game.game_id
+    db.session.commit()
+    return game
+
+# Applies a guess to a game and finalises the stats when it ends
+# Returns (message, status) if the guess is rejected, None otherwise
+def play_guess(game, guess):
+    if game.guess_number >= 6 or game.word in game.guesses or game.status != 1:
+        return 'Game ended', 400
+
+    if len(guess) != 5 or guess not in utils.wordlist(language=game.language):
+        return "Guess invalid", 400
+
+    if game.hard_mode and game.constraints:
+        hard_mode_error = online.hard_mode_error(game.constraints, guess)
+        if hard_mode_error:
+            return hard_mode_error, 400
+
+    game_status, unused_letters, formatted_guess = online.check_guess(game.word, guess, game.language, game.guess_number, game.unused_letters)
+    if game.hard_mode:
+        game.constraints = online.update_hard_mode(game.constraints or online.hard_mode_state(), guess, formatted_guess)
+    game.time = (datetime.datetime.now() - game.start_time).total_seconds()
+    game.unused_letters = unused_letters
+    game.guess_string = (game.guess_string or '') + guess
+    game.patterns = gamestate.append_statuses(game.patterns, game.guess_number, formatted_guess)
+    game.status = game_status
+    game.guess_number = game.guess_number + 1
+    db.session.commit()
+
+    if game.guess_number >= 6 or game.word in game.guesses or game.status != 1:
+        stats = Stats.query.filter_by(user_id=game.user_id).with_for_update().first()
+        stats.points = update_elo(stats.points, game.status == 2)
+        stats.matches += 1
+        if game.status == 2:
+            stats.wins += 1
+            prev_avg = stats.avg_time or 0.0
+            prev_wins = max(stats.wins - 1, 0)
+            stats.avg_time = (prev_avg * prev_wins + game.time) / stats.wins
+        stats.winrate = stats.wins / stats.matches
+        word_counts = record_word_freq(game.user_id, game.guesses)
+        db.session.commit()
+        most_guessed.record(word_counts)
+        leaderboard_cache.record(stats)
+    return None
 
 # Game start endpoint
 @app.route('/online/start')
-@limiter.limit(utils.read_config('rate_limit_start_per_ip'), key_func=get_remote_address)
+@limiter.limit(utils.rate_limit('rate_limit_start_per_ip'), key_func=get_remote_address)
 def start_online():
     user = (request.args.get('user') or '').strip()
     auth = (request.args.get('auth') or '').strip()
     language = (request.args.get('language') or '').strip()
+    hard_mode = (request.args.get('hard_mode') or '').strip().lower() in ('1', 'true', 'yes')
 
-    if not user or not auth:
-        return 'Missing required parameters: user and auth', 400
+    if request.args.get('token'):
+        existing_user, error = authenticate()
+        if error:
+            return error
+    else:
+        if not user or not auth:
+            return 'Missing required parameters: user and auth', 400
 
-    existing_user = User.query.filter_by(username=user).first()
-    if not existing_user:
-        user_create = fn_create_user(user, auth)
-        if user_create == 1:
-            return "Unallowed username", 400
-        elif user_create == 3:
-            return "User blacklisted", 403
-    elif not check_password_hash(existing_user.auth, auth):
-        return 'Wrong auth', 400
+        existing_user = User.query.filter_by(username=user).first()
+        if not existing_user:
+            user_create = fn_create_user(user, auth)
+            if user_create == 1:
+                return "Unallowed username", 400
+            elif user_create == 3:
+                return "User blacklisted", 403
+            existing_user = User.query.filter_by(username=user).first()
+            # Created by a concurrent request, which may not be visible yet and may have set another password
+            if not existing_user:
+                return 'User is being created, try again', 409
+            if user_create != 0 and not check_password_hash(existing_user.auth, auth):
+                return 'Wrong auth', 400
+        elif not check_password_hash(existing_user.auth, auth):
+            return 'Wrong auth', 400
 
     if not language or language not in utils.languages():
         return 'Language invalid', 400
 
-    word = online.generate_word(language)
-    game = Game(username=user, word=word, language=language, time=0, status=1, guesses=[], formatted_guesses=[], guess_number=0, letters=utils.letters(language), start_time=datetime.datetime.now())
-    db.session.add(game)
-    db.session.commit()
-
+    new_game(existing_user, language, hard_mode)
     return 'Started', 200
 
 # Take a guess endpoint
 @app.route('/online/guess')
-@limiter.limit(utils.read_config('rate_limit_guess_per_ip'), key_func=get_remote_address)
+@limiter.limit(utils.rate_limit('rate_limit_guess_per_ip'), key_func=get_remote_address)
 def guess_online():
-    user = (request.args.get('user') or '').strip()
-    auth = (request.args.get('auth') or '').strip()
     guess = (request.args.get('guess') or '').strip()
 
-    if not user or not auth or not guess:
+    if not guess:
         return 'Missing required parameters: user, auth and guess', 401
 
-    existing_user = User.query.filter_by(username=user).first()
-    if not existing_user:
-        return 'User not found', 401
-
-    if not check_password_hash(existing_user.auth, auth):
-        return 'Wrong auth', 403
+    existing_user, error = authenticate(401)
+    if error:
+        return error
 
-    game = Game.query.filter_by(username=user).order_by(Game.game_id.desc()).first()
+    game = current_game(existing_user)
 
     if not game:
         return "The game doesn't exist", 404
 
-    if game.guess_number >= 6 or game.word in game.guesses or game.status != 1:
-        return 'Game ended', 400
+    error = play_guess(game, guess)
+    if error:
+        return error
 
-    if len(guess) != 5 or guess not in utils.wordlist(language=game.language):
-        return "Guess invalid", 400
+    return jsonify({
+            'game_status': game.status,
+            'letters': game.letters,
+            'guesses': game.guesses,
+            'formatted_guesses': game.formatted_guesses,
+            'guess_number': game.guess_number,
+            'time': game.time,
+            'hard_mode': game.hard_mode,
+        })
 
-    game_status, letters, formatted_guess = online.check_guess(game.word, guess, game.language, game.guess_number, game.letters.copy())
-    game.time = (datetime.datetime.now() - game.start_time).total_seconds()
-    updated_guesses = game.guesses + [guess]
-    updated_formatted_guesses = game.formatted_guesses + [formatted_guess]
-    game.letters = letters
-    game.guesses = updated_guesses
-    game.formatted_guesses = updated_formatted_guesses
-    game.status = game_status
-    game.guess_number = game.guess_number + 1
-    db.session.commit()
+# Game session endpoints
+# Authenticates once and returns a session id bound to the new game
+# Later guesses send only the session id and the word and get back a compact delta
+@app.route('/online/session/start')
+@limiter.limit(utils.rate_limit('rate_limit_start_per_ip'), key_func=get_remote_address)
+def start_session():
+    # Clients fall back to /online/start and /online/guess
+    if not sessions.enabled():
+        return 'Game sessions are disabled on this server', 404
 
-    if game.guess_number >= 6 or game.word in game.guesses or game.status != 1:
-        stats = Stats.query.filter_by(username=user).with_for_update().first()
-        stats.points = update_elo(stats.points, game.status == 2)
-        stats.matches += 1
-        if game.status == 2:
-            stats.wins += 1
-            prev_avg = stats.avg_time or 0.0
-            prev_wins = max(stats.wins - 1, 0)
-            stats.avg_time = (prev_avg * prev_wins + game.time) / stats.wins
+    existing_user, error = authenticate()
+    if error:
+        return error
 
-        if not isinstance(stats.word_freq, dict):
-            stats.word_freq = {}
-        for each_guess in game.guesses:
-            if isinstance(each_guess, str) and len(each_guess) <= 5:
-                stats.word_freq[each_guess] = stats.word_freq.get(each_guess, 0) + 1
-        db.session.commit()
+    language = (request.args.get('language') or '').strip()
+    hard_mode = (request.args.get('hard_mode') or '').strip().lower() in ('1', 'true', 'yes')
+    if not language or language not in utils.languages():
+        return 'Language invalid', 400
 
+    game = new_game(existing_user, language, hard_mode)
     return jsonify({
-            'game_status': game_status,
-            'letters': letters,
-            'guesses': updated_guesses,
-            'formatted_guesses': updated_formatted_guesses,
-            'guess_number': game.guess_number,
-            'time': game.time,
-        })
+        'session': sessions.issue_game(game),
+        'expires_in': utils.config().game_session_ttl,
+        'letters': list(utils.letters(language)),
+        'length': len(game.word),
+        'tries': 6,
+        'hard_mode': game.hard_mode,
+    })
+
+# pattern is the base-3 feedback of the guess, letters the unused-letter bitmask over the start response's letters
+@app.route('/online/session/guess')
+@limiter.limit(utils.rate_limit('rate_limit_guess_per_ip'), key_func=get_remote_address)
+def guess_session():
+    payload = sessions.verify_game((request.args.get('session') or '').strip(), utils.config().game_session_ttl)
+    guess = (request.args.get('guess') or '').strip()
+    if not payload:
+        return 'Invalid session', 403
+    if not guess:
+        return 'Missing required parameters: session and guess', 400
+
+    game = db.session.get(Game, payload['game'])
+    if not game or game.user_id != payload['user']:
+        return "The game doesn't exist", 404
+
+    error = play_guess(game, guess)
+    if error:
+        return error
+
+    return jsonify({
+        'pattern': gamestate.split_patterns(game.patterns, game.guess_number, len(game.word))[-1],
+        'letters': game.unused_letters,
+        'game_status': game.status,
+        'guess_number': game.guess_number,
+        'time': game.time,
+    })
+
+# Hint endpoint, ranks the next guesses by expected information over the words still possible
+@app.route('/online/hint')
+@limiter.limit(utils.rate_limit('rate_limit_hint_per_ip'), key_func=get_remote_address)
+def hint_online():
+    existing_user, error = authenticate(401)
+    if error:
+        return error
+
+    try:
+        k = min(max(int(request.args.get('k') or 5), 1), 20)
+    except ValueError:
+        return 'Invalid k', 400
+
+    game = current_game(existing_user)
+    if not game:
+        return "The game doesn't exist", 404
+    if game.status != 1:
+        return 'Game ended', 400
+
+    hints, candidates = online.hints(game.game_id, game.language, game.guesses, game.formatted_guesses, k, game.constraints if game.hard_mode else None)
+    return jsonify({
+        'hints': [{'word': word, 'entropy': entropy} for word, entropy in hints],
+        'candidates': candidates
+    })
 
 # Check what was the word after the game has ended
 @app.route('/online/word')
-@limiter.limit(utils.read_config('rate_limit_word_per_ip'), key_func=get_remote_address)
+@limiter.limit(utils.rate_limit('rate_limit_word_per_ip'), key_func=get_remote_address)
 def get_word():
-    user = (request.args.get('user') or '').strip()
-    auth = (request.args.get('auth') or '').strip()
-
-    if not user or not auth:
-        return 'Missing required parameters: user, auth and guess', 401
+    existing_user, error = authenticate(401)
+    if error:
+        return error
 
-    game = Game.query.filter_by(username=user).order_by(Game.game_id.desc()).first()
-    existing_user = User.query.filter_by(username=user).first()
-    if not existing_user:
-        return 'User not found', 401
-    if not check_password_hash(existing_user.auth, auth):
-        return 'Wrong auth', 403
+    game = current_game(existing_user)
     if not game:
         return "Game doesn't exist", 404
     if game.status != 1:
         return game.word
     return "Game has not ended", 403
 
+# Filtered on every request, so changes to disabled_models apply without a refetch
+model_catalogue = catalogue.ModelCatalogue(ai.fetch_models, lambda: utils.config().ai_models_ttl)
+
 @app.route('/ai/models')
-@limiter.limit(utils.read_config('rate_limit_get_ai_models_per_ip'), key_func=get_remote_address)
+@limiter.limit(utils.rate_limit('rate_limit_get_ai_models_per_ip'), key_func=get_remote_address)
 def get_ai_model():
-    user = (request.args.get('user') or '').strip()
-    auth = (request.args.get('auth') or '').strip()
-
-    if not user or not auth:
-        return 'Missing required parameters: user and auth', 401
-
-    existing_user = User.query.filter_by(username=user).first()
-    if not existing_user:
-        return 'User not found', 401
-    if not check_password_hash(existing_user.auth, auth):
-        return 'Wrong auth', 403
+    existing_user, error = authenticate(401)
+    if error:
+        return error
 
     disabled_models = utils.read_config("disabled_models")
-    models_raw = requests.get(
-        url=f"{os.environ.get("AI_URL", "")}/models",
-        headers={"Authorization": f"Bearer {os.environ.get("AI_KEY", "")}"}
-    ).json()["data"]
-
-    models = []
-    for model in models_raw:
-        models.append(model["id"])
+    try:
+        models = model_catalogue.get(os.environ.get("AI_URL", ""))
+    except Exception as e:
+        logging.warning(f"Failed to fetch the model list: {e}")
+        return 'AI provider error', 502
     models = [model for model in models if model not in disabled_models]
 
     return jsonify({
         'models': models
     })
 
+puzzle_pool = ai.PuzzlePool(lambda model, language: ai.generate_puzzle(ai.client(), model, language), lambda: utils.config().ai_pool_size, lambda: utils.config().ai_pool_workers)
+
 @app.route('/ai/start')
-@limiter.limit(utils.read_config('rate_limit_start_ai_per_ip'), key_func=get_remote_address)
+@limiter.limit(utils.rate_limit('rate_limit_start_ai_per_ip'), key_func=get_remote_address)
 def start_ai():
-    user = (request.args.get('user') or '').strip()
-    auth = (request.args.get('auth') or '').strip()
     model = (request.args.get('model') or '').strip()
     language = (request.args.get('language') or '').strip()
     client = (request.args.get('client') or '').strip()
 
-    if not user or not auth:
-        return 'Missing required parameters: user and auth', 401
-
-    existing_user = User.query.filter_by(username=user).first()
-    if not existing_user:
-        return 'User not found', 401
-    if not check_password_hash(existing_user.auth, auth):
-        return 'Wrong auth', 403
+    existing_user, error = authenticate(401)
+    if error:
+        return error
 
     if not model or not language or not client:
         return 'Missing required parameters: model, language and client', 400
 
-    client = OpenAI(
-        api_key=os.environ.get("AI_KEY", ""),
-        base_url=os.environ.get("AI_URL", "")
-    )
-    response = client.chat.completions.create(
-        model=model,
-        messages=[
-            {"role": "system", "content": "You are a wordle game provider"},
-            {
-                "role": "user",
-                "content":
-                    f'''
-                    Provide a single 5-character {language} word suitable as an answer for a Wordle-style game.
-                    Provide a full letter list for {language} language like a,b,c etc.
-                    Provide a row list for keyboard for {language} language.
-                    Reply with a JSON object only, no extra text. Example format for English:
-                    {"word":"apple","letters":["Q","W","E","R","T","Y","U","I","O","P","A","S","D","F","G","H","J","K","L","Z","X","C","V","B","N","M"],"rows":[["Q","W","E","R","T","Y","U","I","O","P"],["A","S","D","F","G","H","J","K","L"],["ENTER","Z","X","C","V","B","N","M","BACKSPACE"]]}
-                    Return the JSON object exactly as shown.
-                    Do not use tags like ```json.
-                    '''
-            }
-        ]
-    )
+    try:
+        puzzle = puzzle_pool.get(model, language)
+    except Exception as e:
+        logging.warning(f"Failed to generate a puzzle for {model} ({language}): {e}")
+        return 'AI provider error', 502
+    return jsonify({
+        'word': puzzle["word"],
+        'rows': puzzle["rows"] if client == 'flutter' else '',
+        'letters': puzzle["letters"] if client == 'python' else '',
+    })
+
+# Ready puzzles per model and language, a metric for sizing ai_pool_size
+@app.route('/ai/pool')
+@limiter.limit(utils.rate_limit('rate_limit_get_ai_models_per_ip'), key_func=get_remote_address)
+def get_ai_pool():
+    existing_user, error = authenticate(401)
+    if error:
+        return error
+
     return jsonify({
-        'word': json.loads(str(response.choices[0].message.content))["word"],
-        'rows': (json.loads(str(response.choices[0].message.content))["rows"]) if client == 'flutter' else '',
-        'letters': (json.loads(str(response.choices[0].message.content))["letters"]) if client == 'python' else '',
+        'pools': [{'model': model, 'language': language, 'depth': depth, 'pending': pending} for model, language, depth, pending in puzzle_pool.depths()]
     })
 
+# Guesses in a local wordlist of the language are accepted without asking the model
+def local_wordlist(language):
+    return utils.wordlist(language) if language in utils.languages() else None
+
+word_checker = wordcheck.WordChecker(
+    lambda model, language, word: ai.check_word(ai.client(), model, language, word),
+    wordcheck.ValidationCache(os.environ.get('AI_CACHE_PATH', 'ai_cache.sqlite3'), lambda: utils.config().ai_check_cache_ttl),
+    local_wordlist
+)
+
 @app.route('/ai/check')
-@limiter.limit(utils.read_config('rate_limit_check_ai_per_ip'), key_func=get_remote_address)
+@limiter.limit(utils.rate_limit('rate_limit_check_ai_per_ip'), key_func=get_remote_address)
 def check_ai():
-    user = (request.args.get('user') or '').strip()
-    auth = (request.args.get('auth') or '').strip()
     model = (request.args.get('model') or '').strip()
     language = (request.args.get('language') or '').strip()
     guess = (request.args.get('guess') or '').strip()
 
-    if not user or not auth:
-        return 'Missing required parameters: user and auth', 401
-
-    existing_user = User.query.filter_by(username=user).first()
-    if not existing_user:
-        return 'User not found', 401
-    if not check_password_hash(existing_user.auth, auth):
-        return 'Wrong auth', 403
+    existing_user, error = authenticate(401)
+    if error:
+        return error
 
     if not model or not language or not guess:
         return 'Missing required parameters: model, language and guess', 400
 
-    client = OpenAI(
-        api_key=os.environ.get("AI_KEY", ""),
-        base_url=os.environ.get("AI_URL", "")
-    )
-    response = client.chat.completions.create(
-        model=model,
-        messages=[
-            {"role": "system", "content": "You are a wordle game provider."},
-            {"role": "user", "content": f"Check if the word '{guess}' is a correct 5-character word in {language} for a Wordle-style game. Reply with only True or False and no additional text."}
-        ]
-    )
-    return str(response.choices[0].message.content).lower() == "true"
+    try:
+        valid = word_checker.check(model, language, guess)
+    except Exception as e:
+        logging.warning(f"Failed to check {guess} with {model} ({language}): {e}")
+        return 'AI provider error', 502
+    return jsonify(valid)
 
 if __name__ == '__main__':
     app.run(debug=(os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'))
\ No newline at end of file
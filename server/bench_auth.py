@@ -0,0 +1,53 @@
+# Guess throughput benchmark: password auth vs session token
+# Run from the repository root: python -m server.bench_auth [guesses]
+import os
+import secrets
+import sys
+import tempfile
+import time
+
+_db = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+_db.close()
+os.environ['DATABASE_URL'] = f'sqlite:///{_db.name}'
+# The background hint preparation would compete with the timed requests for the CPU
+os.environ['PREPARE_HINTS'] = 'False'
+# Session tokens are only issued with a secret
+os.environ.setdefault('SECRET_KEY', secrets.token_hex(32))
+
+try:
+    from .app import app, limiter
+except ImportError:
+    from app import app, limiter
+
+def run(client, auth_query, guesses):
+    words = ['crane', 'slate', 'moist', 'pious', 'dough']
+    elapsed = 0.0
+    done = 0
+    while done < guesses:
+        client.get(f'/online/start?{auth_query}&language=en')
+        for word in words[:min(len(words), guesses - done)]:
+            start = time.perf_counter()
+            response = client.get(f'/online/guess?{auth_query}&guess={word}')
+            elapsed += time.perf_counter() - start
+            if response.status_code != 200:
+                raise RuntimeError(f"Guess failed: {response.status_code} {response.text}")
+            done += 1
+    return done / elapsed
+
+def main():
+    guesses = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    limiter.enabled = False
+    client = app.test_client()
+    client.get('/online/create_user?user=bench&auth=bench')
+    token = client.get('/online/login?user=bench&auth=bench').json['token']
+
+    password_rate = run(client, 'user=bench&auth=bench', guesses)
+    token_rate = run(client, f'token={token}', guesses)
+    print(f"Password auth: {password_rate:8.1f} guesses/s")
+    print(f"Session token: {token_rate:8.1f} guesses/s ({token_rate / password_rate:.1f}x)")
+
+if __name__ == '__main__':
+    try:
+        main()
+    finally:
+        os.remove(_db.name)
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, replace
+from shared import packed
+
+DATA_DIR = 'data'
+# Packed corpora built by data_pack.py, used instead of parsing the JSON they were built from
+PACKED_DIR = 'packed'
+WORD_LENGTH = 5
+# How often (in seconds) the registry stats the data directory for changes
+CHECK_INTERVAL = 2.0
+
+# Parsed, immutable language data
+@dataclass(frozen=True)
+class Corpus:
+    language: str
+    # frozenset, or the sorted PackedWords of a packed file
+    wordlist: object
+    solutions: tuple
+    letters: tuple
+    rows: tuple
+    sha256: str
+    size: int
+    mtime_ns: int
+
+_lock = threading.Lock()
+_corpora = {}
+_languages = ()
+_last_check = 0.0
+
+def _path(language):
+    return os.path.join(DATA_DIR, f'{language}.json')
+
+def _scan():
+    return tuple(sorted(set(
+        filename.removesuffix('.json')
+        for filename in os.listdir(DATA_DIR)
+        if filename.endswith('.json') and not filename.startswith('.') and os.path.isfile(os.path.join(DATA_DIR, filename))
+    )))
+
+def _packed_path(language):
+    return os.path.join(PACKED_DIR, f'{language}.bin')
+
+def _corpus(language, wordlist, raw_solutions, letters, rows, sha256, stat):
+    solutions = tuple(word.strip().lower() for word in raw_solutions if len(word.strip()) == WORD_LENGTH)
+    if not solutions:
+        raise ValueError(f"No words found for {language} with length {WORD_LENGTH}")
+    return Corpus(
+        language=language,
+        wordlist=wordlist,
+        solutions=solutions,
+        letters=letters,
+        rows=rows,
+        sha256=sha256,
+        size=stat.st_size,
+        mtime_ns=stat.st_mtime_ns,
+    )
+
+# The wordlist stays a view of the mapped file, guesses are checked by binary search over it
+def _from_packed(language, packed_corpus, stat):
+    return _corpus(language, packed_corpus.wordlist, packed_corpus.solutions, packed_corpus.letters, packed_corpus.rows, packed_corpus.sha256, stat)
+
+def _parse(language, raw, sha256, stat):
+    data = json.loads(raw)
+    return _corpus(
+        language,
+        frozenset(data["wordlist"]),
+        data["solutions"],
+        tuple(data["letters"]),
+        tuple(tuple(row) for row in data.get("rows", [])),
+        sha256,
+        stat,
+    )
+
+# (Re)loads a language if its file changed since the last load
+# A packed file recording the JSON's current size and mtime is used without reading the JSON
+def _refresh(language):
+    stat = os.stat(_path(language))
+    current = _corpora.get(language)
+    if current and (current.mtime_ns, current.size) == (stat.st_mtime_ns, stat.st_size):
+        return current
+    packed_corpus = packed.load(_packed_path(language), stat)
+    if packed_corpus is not None:
+        corpus = _from_packed(language, packed_corpus, stat)
+    else:
+        with open(_path(language), 'rb') as f:
+            raw = f.read()
+        sha256 = hashlib.sha256(raw).hexdigest()
+        if current and current.sha256 == sha256:
+            corpus = replace(current, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+        else:
+            packed_corpus = packed.load(_packed_path(language), stat, sha256)
+            if packed_corpus is not None:
+                corpus = _from_packed(language, packed_corpus, stat)
+            else:
+                corpus = _parse(language, raw, sha256, stat)
+    _corpora[language] = corpus
+    return corpus
+
+def _check():
+    global _languages, _last_check
+    scanned = _scan()
+    for language in list(_corpora):
+        if language not in scanned:
+            del _corpora[language]
+    for language in scanned:
+        try:
+            _refresh(language)
+        except (OSError, ValueError, KeyError) as e:
+            # Keep serving the previous version if the file is mid-write or broken
+            logging.warning(f"Failed to load language {language}: {e}")
+    _languages = tuple(language for language in scanned if language in _corpora)
+    _last_check = time.monotonic()
+
+# Loads every language in the data directory
+def load_all():
+    with _lock:
+        _check()
+    return dict(_corpora)
+
+def _maybe_check():
+    if time.monotonic() - _last_check >= CHECK_INTERVAL:
+        with _lock:
+            if time.monotonic() - _last_check >= CHECK_INTERVAL:
+                _check()
+
+def languages():
+    _maybe_check()
+    return _languages
+
+def get(language):
+    _maybe_check()
+    corpus = _corpora.get(language)
+    if corpus is None:
+        raise KeyError(f"Unknown language: {language}")
+    return corpus
@@ -0,0 +1,57 @@
+from shared import feedback
+
+# Compact game state stored on Game instead of rewriting JSON lists on every guess
+# - guesses: one string of fixed-width guesses, i.e. "cranesloth"
+# - patterns: the base-3 pattern of each guess packed into one integer, guess i at digit i in base 3**length
+# - unused letters: a bitmask over the language's letters, bit i set while letters[i] is unused
+# Bitmasks are stored as BIGINT, so a language can have at most 63 letters
+
+def split_guesses(guess_string, length=5):
+    guess_string = guess_string or ''
+    return [guess_string[i:i + length] for i in range(0, len(guess_string), length)]
+
+def append_pattern(packed, index, pattern, length=5):
+    return (packed or 0) + pattern * (3 ** length) ** index
+
+def append_statuses(packed, index, status):
+    return append_pattern(packed, index, feedback.from_statuses(status), len(status))
+
+def split_patterns(packed, count, length=5):
+    base = 3 ** length
+    output = []
+    packed = packed or 0
+    for _ in range(count):
+        packed, pattern = divmod(packed, base)
+        output.append(pattern)
+    return output
+
+def pack_patterns(patterns, length=5):
+    packed = 0
+    for index, pattern in enumerate(patterns):
+        packed = append_pattern(packed, index, pattern, length)
+    return packed
+
+# Per-letter statuses of every guess, the shape the API has always returned
+def formatted_guesses(packed, count, length=5):
+    return [feedback.statuses(pattern, length) for pattern in split_patterns(packed, count, length)]
+
+def full_mask(letters):
+    return (1 << len(letters)) - 1
+
+def letters_mask(unused, letters):
+    index = {letter: i for i, letter in enumerate(letters)}
+    mask = 0
+    for letter in unused:
+        if letter in index:
+            mask |= 1 << index[letter]
+    return mask
+
+def mask_letters(mask, letters):
+    return [letter for i, letter in enumerate(letters) if (mask or 0) >> i & 1]
+
+# Clears the letters of a guess, matching them exactly like the old list.remove did
+def remove_letters(mask, guess, letters):
+    for i, letter in enumerate(letters):
+        if letter in guess:
+            mask &= ~(1 << i)
+    return mask
@@ -0,0 +1,97 @@
+import heapq
+import threading
+import time
+
+# Space-Saving summary: keeps at most `capacity` counters, a new item replaces the smallest one
+# Counts are overestimated by at most the evicted counter, which is kept as the item's error
+class SpaceSaving:
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        # (count, item) entries, stale ones are skipped when popping
+        self.heap = []
+
+    def add(self, item, count=1):
+        if item in self.counts:
+            self.counts[item] += count
+        elif len(self.counts) < self.capacity:
+            self.counts[item] = count
+            self.errors[item] = 0
+        else:
+            minimum, evicted = self._pop_min()
+            del self.counts[evicted], self.errors[evicted]
+            self.counts[item] = minimum + count
+            self.errors[item] = minimum
+        heapq.heappush(self.heap, (self.counts[item], item))
+        if len(self.heap) > 4 * self.capacity:
+            self.heap = [(count, item) for item, count in self.counts.items()]
+            heapq.heapify(self.heap)
+
+    def _pop_min(self):
+        while True:
+            count, item = heapq.heappop(self.heap)
+            if self.counts.get(item) == count:
+                return count, item
+
+    # [(item, count, error)] with the highest counts first
+    def top(self, k=10):
+        items = heapq.nlargest(k, self.counts.items(), key=lambda entry: (entry[1], entry[0]))
+        return [(item, count, self.errors[item]) for item, count in items]
+
+# Most guessed words across all players
+# Seeded from the database (the exact totals) and kept up to date with every finished game in between
+# The reseed after the TTL picks up the other workers' games, it runs outside the lock and is swapped in,
+# so record() on the guess path never waits for the query
+class MostGuessed:
+    def __init__(self, loader, ttl, capacity=1000):
+        self.loader = loader
+        self.ttl = ttl
+        self.capacity = capacity
+        self.lock = threading.Lock()
+        # Held by the one thread reseeding the summary
+        self.refresh_lock = threading.Lock()
+        self.summary = None
+        # Games recorded while the summary is being reseeded, added to the new one before the swap
+        self.pending = None
+        self.loaded_at = 0.0
+
+    def _stale(self):
+        return self.summary is None or time.monotonic() - self.loaded_at >= self.ttl()
+
+    # Only waits for another reseed when there is no summary yet, otherwise the current one is served meanwhile
+    def _refresh(self):
+        if not self._stale() or not self.refresh_lock.acquire(blocking=self.summary is None):
+            return
+        try:
+            if not self._stale():
+                return
+            with self.lock:
+                self.pending = []
+            summary = SpaceSaving(self.capacity)
+            for word, count in self.loader(self.capacity):
+                summary.add(word, int(count))
+            with self.lock:
+                for words in self.pending:
+                    for word, count in words.items():
+                        summary.add(word, count)
+                self.summary = summary
+                self.loaded_at = time.monotonic()
+        finally:
+            with self.lock:
+                self.pending = None
+            self.refresh_lock.release()
+
+    def record(self, words):
+        with self.lock:
+            if self.pending is not None:
+                self.pending.append(words)
+            if self.summary is None:
+                return
+            for word, count in words.items():
+                self.summary.add(word, count)
+
+    def top(self, k=10):
+        self._refresh()
+        with self.lock:
+            return self.summary.top(k)
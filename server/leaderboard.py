@@ -0,0 +1,165 @@
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import namedtuple
+
+SIZE = 10
+
+# Metric: (higher is better, minimum matches to qualify)
+METRICS = {
+    'points': (True, 1),
+    'matches': (True, 1),
+    'avg_time': (False, 10),
+    'winrate': (True, 10),
+    'wins': (True, 1),
+}
+
+Player = namedtuple('Player', ['id', 'username', 'points', 'matches', 'wins', 'avg_time'])
+
+def value(metric, stats):
+    if metric == 'winrate':
+        return stats.wins / stats.matches if stats.matches > 0 else 0
+    return getattr(stats, metric)
+
+def qualifies(metric, stats):
+    if stats.matches < METRICS[metric][1]:
+        return False
+    if metric in ('avg_time', 'wins'):
+        return getattr(stats, metric) > 0
+    return True
+
+# Sort key, ascending from the best player
+def _key(metric, stats):
+    return -value(metric, stats) if METRICS[metric][0] else value(metric, stats)
+
+def _entry(metric, player):
+    return _key(metric, player), player.id, player.username
+
+def _player(stats):
+    return Player(stats.id, stats.username, stats.points or 0, stats.matches or 0, stats.wins or 0, stats.avg_time or 0)
+
+# Order-statistic index over every player's stats, one sorted array per metric
+# Top lists, ranks and neighbours are binary searches instead of COUNT queries and table scans
+# Kept in sync as games finish and accounts change, and reloaded from the database after the TTL
+# The reload builds new arrays outside the lock and swaps them in, so record() never waits for it
+class Leaderboard:
+    def __init__(self, loader, ttl):
+        # loader() -> iterable of stats rows, ttl() -> seconds
+        self.loader = loader
+        self.ttl = ttl
+        self.lock = threading.RLock()
+        # Held by the one thread reloading the index
+        self.refresh_lock = threading.Lock()
+        self.players = None
+        self.indexes = {}
+        # Changes made while the index is being reloaded, applied to the new one before the swap
+        self.pending = None
+        self.loaded_at = 0.0
+
+    def _stale(self):
+        return self.players is None or time.monotonic() - self.loaded_at >= self.ttl()
+
+    # Only waits for another reload when there is no index yet, otherwise the current one is served meanwhile
+    def _load(self):
+        if not self._stale() or not self.refresh_lock.acquire(blocking=self.players is None):
+            return
+        try:
+            if not self._stale():
+                return
+            with self.lock:
+                self.pending = []
+            players = {row.username: _player(row) for row in self.loader()}
+            indexes = {
+                metric: sorted(_entry(metric, player) for player in players.values() if qualifies(metric, player))
+                for metric in METRICS
+            }
+            with self.lock:
+                self.players, self.indexes = players, indexes
+                for change, args in self.pending:
+                    change(*args)
+                self.loaded_at = time.monotonic()
+        finally:
+            with self.lock:
+                self.pending = None
+            self.refresh_lock.release()
+
+    def _remove(self, player):
+        for metric, entries in self.indexes.items():
+            if qualifies(metric, player):
+                entry = _entry(metric, player)
+                i = bisect_left(entries, entry)
+                if i < len(entries) and entries[i] == entry:
+                    del entries[i]
+
+    def _add(self, player):
+        self.players[player.username] = player
+        for metric, entries in self.indexes.items():
+            if qualifies(metric, player):
+                insort(entries, _entry(metric, player))
+
+    # Runs a change on the current index, and again on the one being reloaded
+    def _change(self, change, *args):
+        with self.lock:
+            if self.pending is not None:
+                self.pending.append((change, args))
+            if self.players is not None:
+                change(*args)
+
+    def player(self, username):
+        self._load()
+        with self.lock:
+            return self.players.get(username)
+
+    def top(self, metric, size=SIZE):
+        self._load()
+        with self.lock:
+            return [(username, value(metric, self.players[username])) for _, _, username in self.indexes[metric][:size]]
+
+    # Number of qualifying players strictly ahead of the given stats
+    def ahead(self, metric, stats):
+        self._load()
+        with self.lock:
+            return bisect_left(self.indexes[metric], (_key(metric, stats),))
+
+    # Players ranked around a user, as (rank, username, value)
+    def neighbours(self, metric, username, n):
+        self._load()
+        with self.lock:
+            player = self.players.get(username)
+            if player is None:
+                return []
+            entries = self.indexes[metric]
+            if qualifies(metric, player):
+                position = bisect_left(entries, _entry(metric, player))
+            else:
+                position = bisect_left(entries, (_key(metric, player),))
+            result = []
+            for key, _, name in entries[max(position - n, 0):position + n + 1]:
+                result.append((bisect_left(entries, (key,)) + 1, name, value(metric, self.players[name])))
+            return result
+
+    def _record(self, player):
+        old = self.players.get(player.username)
+        if old:
+            self._remove(old)
+        self._add(player)
+
+    # Applies a user's new stats without touching the database
+    def record(self, stats):
+        self._change(self._record, _player(stats))
+
+    def _remove_user(self, username):
+        if username in self.players:
+            self._remove(self.players.pop(username))
+
+    def remove(self, username):
+        self._change(self._remove_user, username)
+
+    def _rename(self, username, new_username):
+        if username in self.players:
+            player = self.players.pop(username)
+            self._remove(player)
+            self._add(player._replace(username=new_username))
+
+    def rename(self, username, new_username):
+        self._change(self._rename, username, new_username)
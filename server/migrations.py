@@ -0,0 +1,243 @@
+import json
+import logging
+import os
+import tempfile
+from contextlib import contextmanager
+from sqlalchemy import inspect, text
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+from shared import feedback
+try:
+    from . import corpus, gamestate
+except Exception:
+    import corpus, gamestate
+
+BATCH_SIZE = int(os.environ.get('MIGRATION_BATCH_SIZE', 1000))
+# Key of the Postgres advisory lock held while migrating
+LOCK_KEY = 7210694453
+# Lock file used instead on other databases, where every worker shares one machine
+LOCK_PATH = os.path.join(tempfile.gettempdir(), 'wordle-migrations.lock')
+
+def _columns(conn, table):
+    return {column['name'] for column in inspect(conn).get_columns(table)}
+
+# Stats.winrate: stored so winrate ranks come from an index instead of a Python loop
+def _stats_winrate(conn):
+    if 'winrate' in _columns(conn, 'stats'):
+        return
+    conn.execute(text('ALTER TABLE stats ADD COLUMN winrate FLOAT'))
+    conn.execute(text('UPDATE stats SET winrate = CASE WHEN matches > 0 THEN CAST(wins AS FLOAT) / matches ELSE 0 END'))
+
+# Game.hard_mode and the per-game hard mode constraint state
+def _game_hard_mode(conn):
+    columns = _columns(conn, 'game')
+    if 'hard_mode' not in columns:
+        conn.execute(text('ALTER TABLE game ADD COLUMN hard_mode BOOLEAN NOT NULL DEFAULT FALSE'))
+    if 'constraints' not in columns:
+        conn.execute(text('ALTER TABLE game ADD COLUMN constraints JSON'))
+
+# User.active_game_id, pointing at each user's latest game
+def _user_active_game(conn):
+    if 'active_game_id' in _columns(conn, 'user'):
+        return
+    conn.execute(text('ALTER TABLE "user" ADD COLUMN active_game_id INTEGER'))
+    owner = 'game.username = "user".username' if 'username' in _columns(conn, 'game') else 'game.user_id = "user".id'
+    conn.execute(text(f'UPDATE "user" SET active_game_id = (SELECT MAX(game.game_id) FROM game WHERE {owner})'))
+
+def _json(value):
+    return json.loads(value) if isinstance(value, str) else value
+
+def _alphabet(language):
+    try:
+        return corpus.get(language).letters
+    except KeyError:
+        return ()
+
+# Game.guess_string, patterns and unused_letters replace the guesses, formatted_guesses and letters JSON lists
+# Only adds the columns, existing rows are converted by _backfill_compact_state
+def _game_compact_state(conn):
+    columns = _columns(conn, 'game')
+    for name, column_type in (('guess_string', 'VARCHAR(80)'), ('patterns', 'BIGINT'), ('unused_letters', 'BIGINT')):
+        if name not in columns:
+            conn.execute(text(f'ALTER TABLE game ADD COLUMN {name} {column_type}'))
+
+# Game.user_id and Stats.user_id, integer foreign keys replacing the username copies
+def _user_ids(conn):
+    for table in ('game', 'stats'):
+        if 'user_id' not in _columns(conn, table):
+            conn.execute(text(f'ALTER TABLE {table} ADD COLUMN user_id INTEGER REFERENCES "user" (id) ON DELETE CASCADE'))
+
+MIGRATIONS = [
+    _stats_winrate,
+    _game_hard_mode,
+    _user_active_game,
+    _game_compact_state,
+    _user_ids,
+]
+
+# Fills user_id from the username one id range at a time, each batch in its own short transaction
+# so a large game table is never locked for long, then drops the username column
+def _move_to_user_id(engine, table, key):
+    with engine.connect() as conn:
+        if 'username' not in _columns(conn, table):
+            return
+        low, high = conn.execute(text(f'SELECT MIN({key}), MAX({key}) FROM {table} WHERE user_id IS NULL')).one()
+    if low is not None:
+        for start in range(low, high + 1, BATCH_SIZE):
+            with engine.begin() as conn:
+                conn.execute(text(
+                    f'UPDATE {table} SET user_id = (SELECT "user".id FROM "user" WHERE "user".username = {table}.username) '
+                    f'WHERE {key} >= :start AND {key} < :end AND user_id IS NULL'
+                ), {'start': start, 'end': start + BATCH_SIZE})
+    with engine.begin() as conn:
+        # Rows left behind by accounts that no longer exist
+        orphans = conn.execute(text(f'DELETE FROM {table} WHERE user_id IS NULL')).rowcount
+        for index in inspect(conn).get_indexes(table):
+            if 'username' in index['column_names']:
+                conn.execute(text(f'DROP INDEX {index["name"]}'))
+        conn.execute(text(f'ALTER TABLE {table} DROP COLUMN username'))
+    logging.info(f"Moved {table} to user_id{f', removed {orphans} orphaned rows' if orphans else ''}")
+
+# user_id was added as nullable, the model declares it NOT NULL
+# Tightened once every row has one, on Postgres; SQLite can't alter a column in place
+def _user_id_not_null(engine, table):
+    if engine.dialect.name != 'postgresql':
+        return
+    with engine.begin() as conn:
+        if not any(column['name'] == 'user_id' and column['nullable'] for column in inspect(conn).get_columns(table)):
+            return
+        orphans = conn.execute(text(f'DELETE FROM {table} WHERE user_id IS NULL')).rowcount
+        conn.execute(text(f'ALTER TABLE {table} ALTER COLUMN user_id SET NOT NULL'))
+    logging.info(f"Made {table}.user_id NOT NULL{f', removed {orphans} orphaned rows' if orphans else ''}")
+
+# Moves game and stats to user_id, then makes it NOT NULL
+def _backfill_user_ids(engine):
+    for table, key in (('game', 'game_id'), ('stats', 'id')):
+        _move_to_user_id(engine, table, key)
+        _user_id_not_null(engine, table)
+
+# Converts the JSON lists of existing games to the compact state one id range at a time,
+# each batch in its own transaction, then drops the emptied JSON columns
+def _backfill_compact_state(engine):
+    with engine.connect() as conn:
+        if 'guesses' not in _columns(conn, 'game'):
+            return
+        low, high = conn.execute(text('SELECT MIN(game_id), MAX(game_id) FROM game WHERE guess_string IS NULL')).one()
+    converted = 0
+    if low is not None:
+        for start in range(low, high + 1, BATCH_SIZE):
+            with engine.begin() as conn:
+                rows = conn.execute(text(
+                    'SELECT game_id, language, guesses, formatted_guesses, letters FROM game '
+                    'WHERE game_id >= :start AND game_id < :end AND guess_string IS NULL'
+                ), {'start': start, 'end': start + BATCH_SIZE}).fetchall()
+                if not rows:
+                    continue
+                updates = []
+                for game_id, language, guesses, formatted_guesses, letters in rows:
+                    guesses = [guess for guess in _json(guesses) or [] if isinstance(guess, str)]
+                    patterns = [feedback.from_statuses(status or []) for status in _json(formatted_guesses) or []]
+                    updates.append({
+                        'game_id': game_id,
+                        'guess_string': ''.join(guesses),
+                        'patterns': gamestate.pack_patterns(patterns, len(guesses[0]) if guesses else 5),
+                        'unused_letters': gamestate.letters_mask(_json(letters) or [], _alphabet(language)),
+                    })
+                conn.execute(text(
+                    'UPDATE game SET guess_string = :guess_string, patterns = :patterns, unused_letters = :unused_letters '
+                    'WHERE game_id = :game_id'
+                ), updates)
+                converted += len(updates)
+    with engine.begin() as conn:
+        for column in ('guesses', 'formatted_guesses', 'letters'):
+            conn.execute(text(f'ALTER TABLE game DROP COLUMN {column}'))
+    logging.info(f"Converted {converted} games to the compact state")
+
+# Moves the Stats.word_freq JSON to the word_freq table, one row per user and word,
+# one stats id range per transaction, then drops the column
+# Runs before _backfill_user_ids, while stats can still be matched to users by username
+def _backfill_word_freq(engine):
+    with engine.connect() as conn:
+        columns = _columns(conn, 'stats')
+        if 'word_freq' not in columns:
+            return
+        low, high = conn.execute(text('SELECT MIN(id), MAX(id) FROM stats WHERE word_freq IS NOT NULL')).one()
+    owner = '"user".username = stats.username' if 'username' in columns else '"user".id = stats.user_id'
+    moved = 0
+    if low is not None:
+        for start in range(low, high + 1, BATCH_SIZE):
+            with engine.begin() as conn:
+                rows = conn.execute(text(
+                    f'SELECT stats.id, "user".id, stats.word_freq FROM stats LEFT JOIN "user" ON {owner} '
+                    'WHERE stats.id >= :start AND stats.id < :end AND stats.word_freq IS NOT NULL'
+                ), {'start': start, 'end': start + BATCH_SIZE}).fetchall()
+                if not rows:
+                    continue
+                counts = [
+                    {'user_id': user_id, 'word': word, 'count': count}
+                    for _, user_id, word_freq in rows if user_id is not None
+                    for word, count in (_json(word_freq) or {}).items()
+                ]
+                if counts:
+                    conn.execute(text('INSERT INTO word_freq (user_id, word, count) VALUES (:user_id, :word, :count)'), counts)
+                conn.execute(text('UPDATE stats SET word_freq = NULL WHERE id = :id'), [{'id': row[0]} for row in rows])
+                moved += len(counts)
+    with engine.begin() as conn:
+        conn.execute(text('ALTER TABLE stats DROP COLUMN word_freq'))
+    logging.info(f"Moved {moved} word counts to the word_freq table")
+
+BACKFILLS = [
+    _backfill_compact_state,
+    _backfill_word_freq,
+    _backfill_user_ids,
+]
+
+# Only one process migrates at a time, the others wait for it and then find every step applied
+@contextmanager
+def _lock(engine):
+    if engine.dialect.name == 'postgresql':
+        with engine.connect() as conn:
+            conn.execute(text('SELECT pg_advisory_lock(:key)'), {'key': LOCK_KEY})
+            conn.commit()
+            try:
+                yield
+            finally:
+                conn.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': LOCK_KEY})
+                conn.commit()
+    elif fcntl is not None:
+        with open(LOCK_PATH, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    else:
+        yield
+
+# Brings a database created by an older version up to the current schema
+# Safe to run on every start, each step checks whether it has already been applied
+def run(db):
+    with _lock(db.engine):
+        _run(db)
+
+def _run(db):
+    db.create_all()
+    with db.engine.begin() as conn:
+        for migration in MIGRATIONS:
+            migration(conn)
+    for backfill in BACKFILLS:
+        backfill(db.engine)
+    # Indexes added to existing tables after they were created
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+    logging.info("Database schema up to date")
+
+# python -m server.migrations migrates the database ahead of a deploy, the server runs the same steps on start
+# MIGRATION_BATCH_SIZE sets the number of rows per backfill transaction
+if __name__ == '__main__':
+    from server.app import app, db
+    with app.app_context():
+        run(db)
@@ -1,9 +1,17 @@
 import random
-from collections import Counter
+import threading
+from collections import OrderedDict
+from shared import feedback
 try:
-    from . import utils
+    from . import utils, gamestate
 except Exception:
-    import utils
+    import utils, gamestate
+
+HINT_CACHE_SIZE = 10000
+
+# game_id -> (guesses applied, letter index mask, solver)
+_candidates = OrderedDict()
+_candidates_lock = threading.Lock()
 
 # Random word generation
 def generate_word(language):
@@ -12,33 +20,14 @@ def generate_word(language):
 
 # Guess formatting
 def format_guess(guess, word):
-    if not guess or len(guess) != len(word):
+    pattern = feedback.score(guess, word)
+    if pattern is None:
         return None
-
-    output = []
-    counts = Counter(word)
-    status = [0]*len(guess)
-
-    for i, char in enumerate(guess):
-        if char == word[i]:
-            status[i] = 2
-            counts[char] -= 1
-    for i, char in enumerate(guess):
-        if status[i] == 0 and counts[char] > 0:
-            status[i] = 1
-            counts[char] -= 1
-
-    for i, char in enumerate(guess):
-        if status[i] == 2:
-            output.append(2)
-        elif status[i] == 1:
-            output.append(1)
-        else:
-            output.append(0)
-    return output
+    return feedback.statuses(pattern, len(word))
 
 # Guess checking
-def check_guess(word, guess, language, guess_number, letters):
+# unused is the game's unused-letter bitmask, see gamestate.py
+def check_guess(word, guess, language, guess_number, unused):
     tries = 6
     game_status = 1
 
@@ -49,7 +38,83 @@ def check_guess(word, guess, language, guess_number, letters):
         if guess == word:
             game_status = 2
         else:
-            for char in set(guess):
-                if char in letters:
-                    letters.remove(char)
-    return game_status, letters, format_guess(guess, word)
\ No newline at end of file
+            unused = gamestate.remove_letters(unused, guess, utils.letters(language))
+    return game_status, unused, format_guess(guess, word)
+
+# Hard mode constraint state: letters fixed by greens and the minimum count of every revealed letter
+# Updated after each guess so validating the next one never replays the earlier guesses
+def hard_mode_state(length=5):
+    return {'fixed': '_' * length, 'min': {}}
+
+def update_hard_mode(state, guess, formatted_guess):
+    fixed = list(state['fixed'])
+    revealed = {}
+    for i, (char, status) in enumerate(zip(guess, formatted_guess)):
+        if status == feedback.GREEN:
+            fixed[i] = char
+        if status != feedback.GREY:
+            revealed[char] = revealed.get(char, 0) + 1
+    minimum = dict(state['min'])
+    for char, count in revealed.items():
+        minimum[char] = max(minimum.get(char, 0), count)
+    return {'fixed': ''.join(fixed), 'min': minimum}
+
+# Returns why a guess breaks hard mode, None if it is allowed
+def hard_mode_error(state, guess):
+    for i, (char, fixed) in enumerate(zip(guess, state['fixed'])):
+        if fixed != '_' and char != fixed:
+            return f"Hard mode: letter {i + 1} must be {fixed.upper()}"
+    counts = {}
+    for char in guess:
+        counts[char] = counts.get(char, 0) + 1
+    for char, count in state['min'].items():
+        if counts.get(char, 0) < count:
+            return f"Hard mode: guess must contain {char.upper()}{f' {count} times' if count > 1 else ''}"
+    return None
+
+# Letter index mask of the words a hard mode game still accepts, the rules of hard_mode_error
+def hard_mode_mask(index, state):
+    fixed = {i: char for i, char in enumerate(state['fixed']) if char != '_'}
+    return index.constrained(fixed, state['min'])
+
+# Words still consistent with a game's guesses, from the positional letter index
+def possible_words(language, guesses, formatted_guesses, solutions_only=True):
+    index = utils.letter_index(language)
+    return index.words_in(index.mask(guesses, formatted_guesses, solutions_only))
+
+def possible_count(language, guesses, formatted_guesses, solutions_only=True):
+    index = utils.letter_index(language)
+    return index.count(index.mask(guesses, formatted_guesses, solutions_only))
+
+# Letter index mask of the solutions still consistent with a game
+# Narrowed incrementally from the mask left after the previous hint request
+def remaining_candidates(game_id, solver, guesses, formatted_guesses):
+    with _candidates_lock:
+        cached = _candidates.pop(game_id, None)
+    applied, mask = 0, None
+    if cached and cached[2] is solver and cached[0] <= len(guesses):
+        applied, mask = cached[0], cached[1]
+    mask = solver.index.mask(guesses[applied:], formatted_guesses[applied:], solutions_only=True, start=mask)
+    with _candidates_lock:
+        _candidates[game_id] = (len(guesses), mask, solver)
+        while len(_candidates) > HINT_CACHE_SIZE:
+            _candidates.popitem(last=False)
+    return mask
+
+# Top-k next guesses for a game as (word, expected information in bits), plus the number of possible words
+# With hard mode constraints only the guesses hard_mode_error accepts are ranked
+def hints(game_id, language, guesses, formatted_guesses, k=5, constraints=None):
+    solver = utils.solver(language)
+    mask = remaining_candidates(game_id, solver, guesses, formatted_guesses)
+    allowed = None
+    if constraints:
+        allowed_mask = hard_mode_mask(solver.index, constraints)
+        if allowed_mask != solver.index.all:
+            allowed = solver.index.indices(allowed_mask)
+    return solver.rank(solver.from_mask(mask), k, allowed), solver.index.count(mask)
+
+# Builds the solvers and their opening rankings ahead of the first hint request
+def prepare_hints():
+    for language in utils.languages():
+        solver = utils.solver(language)
+        solver.rank(solver.all_candidates())
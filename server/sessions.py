@@ -0,0 +1,62 @@
+import hashlib
+import hmac
+import os
+from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+
+_serializer = None
+_game_serializer = None
+
+# Tokens are signed with SECRET_KEY, which every worker shares and which survives restarts
+# Without it no tokens are issued or accepted, and clients keep authenticating with user and auth
+def enabled():
+    return bool(os.environ.get('SECRET_KEY'))
+
+# Created on first use, after app.py has loaded .env
+def _get_serializer():
+    global _serializer
+    if _serializer is None:
+        _serializer = URLSafeTimedSerializer(os.environ['SECRET_KEY'], salt='wordle-session')
+    return _serializer
+
+def _get_game_serializer():
+    global _game_serializer
+    if _game_serializer is None:
+        _game_serializer = URLSafeTimedSerializer(_get_serializer().secret_key, salt='wordle-game')
+    return _game_serializer
+
+# Short fingerprint of the stored password hash, so changing the password revokes old tokens
+def _auth_tag(user):
+    return hashlib.sha256(user.auth.encode('utf-8')).hexdigest()[:16]
+
+def issue(user):
+    return _get_serializer().dumps({'id': user.id, 'tag': _auth_tag(user)})
+
+# Returns the token payload, or None if it is forged or expired
+def verify(token, max_age):
+    if not enabled():
+        return None
+    try:
+        payload = _get_serializer().loads(token, max_age=max_age)
+    except (BadSignature, SignatureExpired):
+        return None
+    if not isinstance(payload, dict) or not isinstance(payload.get('id'), int):
+        return None
+    return payload
+
+def matches(payload, user):
+    return user is not None and hmac.compare_digest(str(payload.get('tag', '')), _auth_tag(user))
+
+# Game session id, bound to one game so guesses need neither the password nor the user row
+def issue_game(game):
+    return _get_game_serializer().dumps({'game': game.game_id, 'user': game.user_id})
+
+def verify_game(token, max_age):
+    if not enabled():
+        return None
+    try:
+        payload = _get_game_serializer().loads(token, max_age=max_age)
+    except (BadSignature, SignatureExpired):
+        return None
+    if not isinstance(payload, dict) or not isinstance(payload.get('game'), int) or not isinstance(payload.get('user'), int):
+        return None
+    return payload
@@ -0,0 +1,108 @@
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from dataclasses import dataclass, fields
+
+CONFIG_PATH = 'server/config.json'
+# How often (in seconds) the config file is stat'ed for changes
+CHECK_INTERVAL = 2.0
+
+# Typed server configuration, see readme.md for the meaning of every key
+@dataclass(frozen=True)
+class Config:
+    base_elo: int = 1000
+    win_bonus: int = 10
+    k_win: int = 48
+    k_loss: int = 28
+    rate_limit_auth_per_ip: str = "20/minute"
+    rate_limit_check_per_ip: str = "20/minute"
+    rate_limit_leaderboard_per_ip: str = "10/minute"
+    rate_limit_stats_per_ip: str = "10/minute"
+    rate_limit_create_per_ip: str = "10/hour"
+    rate_limit_change_data_per_ip: str = "5/hour"
+    rate_limit_delete_user_per_ip: str = "5/hour"
+    rate_limit_start_per_ip: str = "5/minute"
+    rate_limit_guess_per_ip: str = "60/minute"
+    rate_limit_word_per_ip: str = "5/minute"
+    rate_limit_get_ai_models_per_ip: str = "10/minute"
+    rate_limit_start_ai_per_ip: str = "5/minute"
+    rate_limit_check_ai_per_ip: str = "30/minute"
+    rate_limit_hint_per_ip: str = "30/minute"
+    session_ttl: int = 86400
+    game_session_ttl: int = 3600
+    leaderboard_ttl: int = 60
+    ai_pool_size: int = 3
+    ai_pool_workers: int = 2
+    ai_check_cache_ttl: int = 2592000
+    ai_models_ttl: int = 600
+    disabled_models: tuple = ()
+
+_lock = threading.RLock()
+_current = None
+_stat = None
+_last_check = 0.0
+
+def _validate(raw):
+    if not isinstance(raw, dict):
+        raise ValueError("Config must be a JSON object")
+    values = {}
+    for field in fields(Config):
+        if field.name not in raw:
+            continue
+        value = raw[field.name]
+        if field.type is tuple:
+            if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+                raise ValueError(f"Config key {field.name} must be a list of strings")
+            value = tuple(value)
+        elif not isinstance(value, field.type) or isinstance(value, bool):
+            raise ValueError(f"Config key {field.name} must be of type {field.type.__name__}")
+        values[field.name] = value
+    unknown = set(raw) - {field.name for field in fields(Config)}
+    if unknown:
+        logging.warning(f"Unknown config keys ignored: {', '.join(sorted(unknown))}")
+    return Config(**values)
+
+# Parses the file and atomically swaps in the new config
+def reload():
+    global _current, _stat, _last_check
+    with _lock:
+        stat = os.stat(CONFIG_PATH)
+        with open(CONFIG_PATH, encoding='utf-8') as config_file:
+            config = _validate(json.load(config_file))
+        _current = config
+        _stat = (stat.st_mtime_ns, stat.st_size)
+        _last_check = time.monotonic()
+    return _current
+
+def _maybe_reload():
+    global _last_check
+    if time.monotonic() - _last_check < CHECK_INTERVAL:
+        return
+    _last_check = time.monotonic()
+    try:
+        stat = os.stat(CONFIG_PATH)
+        if (stat.st_mtime_ns, stat.st_size) != _stat:
+            reload()
+    except (OSError, ValueError) as e:
+        # Keep the last good config
+        logging.warning(f"Failed to reload config: {e}")
+
+def get():
+    if _current is None:
+        return reload()
+    _maybe_reload()
+    return _current
+
+def _on_sighup(signum, frame):
+    try:
+        reload()
+    except (OSError, ValueError) as e:
+        logging.warning(f"Failed to reload config: {e}")
+
+# Under gunicorn SIGHUP belongs to the arbiter, which reloads the workers (and with them the config)
+if hasattr(signal, 'SIGHUP') and threading.current_thread() is threading.main_thread() and 'gunicorn' not in sys.modules:
+    signal.signal(signal.SIGHUP, _on_sighup)
@@ -1,37 +1,96 @@
+import gzip
+import hashlib
 import os
-import json
+from shared import patterns, solver as solvers
+try:
+    from . import corpus, settings
+except Exception:
+    import corpus, settings
+
+PATTERNS_DIR = 'patterns'
+# Size of the chunks language downloads are streamed in
+DOWNLOAD_CHUNK = 64 * 1024
+
+_matrices = {}
+_solvers = {}
+_manifest = None
+_downloads = {}
+
+def config():
+    return settings.get()
 
 def read_config(param):
-    with open('server/config.json') as config_file:
-        config = json.load(config_file)
-    if param in config:
-        return config[param]
-    else:
-        return None
+    return getattr(settings.get(), param, None)
+
+# Rate limit string that follows config reloads
+def rate_limit(param):
+    return lambda: read_config(param)
 
 # Get a list of the available languages
 def languages():
-    return sorted(set(
-        filename.removesuffix('.json')
-        for filename in os.listdir('data')
-        if os.path.isfile(os.path.join('data', filename))
-    ))
+    return corpus.languages()
+
+# Hash, size and version of every language, with an ETag covering all of them
+# The hashes were computed when the corpora were loaded, the manifest is rebuilt only when one of them is reloaded
+def manifest():
+    global _manifest
+    corpora = [corpus.get(language) for language in languages()]
+    key = tuple((data.language, data.sha256, data.size, data.mtime_ns) for data in corpora)
+    if _manifest is None or _manifest[0] != key:
+        body = {data.language: {'sha256': data.sha256, 'size': data.size, 'version': data.mtime_ns} for data in corpora}
+        etag = hashlib.sha256(''.join(f'{language}:{sha256}\n' for language, sha256, _, _ in key).encode()).hexdigest()
+        _manifest = (key, body, etag)
+    return _manifest[1], _manifest[2]
+
+def checksum(language):
+    return corpus.get(language).sha256
+
+# (sha256, raw bytes, gzip bytes) of a language file, read and compressed once per version of the file
+def download(language):
+    data = corpus.get(language)
+    cached = _downloads.get(language)
+    if cached is None or cached[0] is not data:
+        with open(os.path.join(corpus.DATA_DIR, f'{language}.json'), 'rb') as f:
+            raw = f.read()
+        sha256 = hashlib.sha256(raw).hexdigest()
+        cached = (data, (sha256, raw, gzip.compress(raw, compresslevel=9, mtime=0)))
+        # The file changed since the corpus was loaded, serve it but don't keep it
+        if sha256 != data.sha256:
+            return cached[1]
+        _downloads[language] = cached
+    return cached[1]
 
 def wordlist(language):
-    with open(f'data/{language}.json') as f:
-        return json.load(f)["wordlist"]
+    return corpus.get(language).wordlist
 
 def solutions(language):
-    with open(f'data/{language}.json') as f:
-        return json.load(f)["solutions"]
+    return corpus.get(language).solutions
 
 def letters(language):
-    with open(f'data/{language}.json') as f:
-        return json.load(f)["letters"]
+    return corpus.get(language).letters
 
 # Get words with length of 5
 def filtered(language):
-    filtered_words = [word.strip().lower() for word in solutions(language) if len(word.strip()) == 5]
-    if not filtered_words:
-        raise ValueError(f"No words found for {language} with length 5")
-    return filtered_words
\ No newline at end of file
+    return corpus.get(language).solutions
+
+# Memory-mapped pattern matrix built by data_patterns.py, None if it is missing or outdated
+def pattern_matrix(language):
+    data = corpus.get(language)
+    cached = _matrices.get(language)
+    if cached is None or cached[0] is not data:
+        matrix = patterns.load(f'{PATTERNS_DIR}/{language}.bin', data.sha256, data.wordlist, data.solutions)
+        cached = (data, matrix)
+        _matrices[language] = cached
+    return cached[1]
+
+def solver(language):
+    data = corpus.get(language)
+    cached = _solvers.get(language)
+    if cached is None or cached[0] is not data:
+        cached = (data, solvers.Solver(data.letters, data.wordlist, data.solutions, pattern_matrix(language)))
+        _solvers[language] = cached
+    return cached[1]
+
+# Positional letter index over the solver's guesses and solutions, rebuilt with the solver
+def letter_index(language):
+    return solver(language).index
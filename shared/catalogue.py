@@ -0,0 +1,73 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+# Lists of available AI models per provider URL, served from memory and refreshed once older than the TTL
+# Only a provider never fetched before is waited on, afterwards the cached list is returned while a background
+# thread refreshes it (stale-while-revalidate)
+# With a path, the lists are also kept on disk so a new process starts with the last ones it knew
+class ModelCatalogue:
+    def __init__(self, fetch, ttl, path=None):
+        # fetch(url) -> list of model ids, ttl() -> seconds
+        self.fetch = fetch
+        self.ttl = ttl
+        self.path = path
+        self.lock = threading.Lock()
+        # url -> (models, fetched_at)
+        self.entries = None
+        self.refreshing = set()
+
+    def _load(self):
+        if self.entries is not None:
+            return self.entries
+        self.entries = {}
+        if self.path:
+            try:
+                with open(self.path, encoding='utf-8') as catalogue_file:
+                    stored = json.load(catalogue_file)
+                self.entries = {url: (entry["models"], entry["fetched_at"]) for url, entry in stored.items()}
+            except (OSError, ValueError, KeyError, TypeError, AttributeError):
+                self.entries = {}
+        return self.entries
+
+    def _save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(self.path), suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as catalogue_file:
+            json.dump({url: {"models": models, "fetched_at": fetched_at} for url, (models, fetched_at) in self.entries.items()}, catalogue_file)
+        os.replace(temp_path, self.path)
+
+    def _refresh(self, url):
+        try:
+            models = list(self.fetch(url))
+            with self.lock:
+                self.entries[url] = (models, time.time())
+                if self.path:
+                    try:
+                        self._save()
+                    except OSError as e:
+                        logging.warning(f"Failed to save the model list: {e}")
+            return models
+        finally:
+            with self.lock:
+                self.refreshing.discard(url)
+
+    def _refresh_in_background(self, url):
+        try:
+            self._refresh(url)
+        except Exception as e:
+            # Keep serving the stale list, the next request tries again
+            logging.warning(f"Failed to refresh the model list from {url}: {e}")
+
+    def get(self, url):
+        with self.lock:
+            entry = self._load().get(url)
+            if entry is not None:
+                if time.time() - entry[1] >= self.ttl() and url not in self.refreshing:
+                    self.refreshing.add(url)
+                    threading.Thread(target=self._refresh_in_background, args=(url,), daemon=True).start()
+                return entry[0]
+        return self._refresh(url)
@@ -0,0 +1,94 @@
+import numpy as np
+
+GREY, YELLOW, GREEN = 0, 1, 2
+
+# Feedback engine
+# A pattern is the whole feedback for a guess as one base-3 integer: sum(status[i] * 3**i)
+# Words are encoded as small int arrays over the language alphabet for the batch API
+
+def pattern_dtype(length):
+    return np.uint8 if 3 ** length <= 256 else np.uint32
+
+# Pattern of a single guess, pure Python since NumPy overhead dominates for one pair
+def score(guess, word):
+    if not guess or len(guess) != len(word):
+        return None
+    remaining = {}
+    for g, w in zip(guess, word):
+        if g != w:
+            remaining[w] = remaining.get(w, 0) + 1
+    pattern = 0
+    power = 1
+    for g, w in zip(guess, word):
+        if g == w:
+            pattern += GREEN * power
+        elif remaining.get(g, 0) > 0:
+            remaining[g] -= 1
+            pattern += YELLOW * power
+        power *= 3
+    return pattern
+
+# Per-letter statuses of a pattern, i.e. [0, 1, 0, 0, 2]
+def statuses(pattern, length):
+    output = []
+    for _ in range(length):
+        pattern, status = divmod(pattern, 3)
+        output.append(status)
+    return output
+
+def from_statuses(status):
+    pattern = 0
+    for value in reversed(status):
+        pattern = pattern * 3 + value
+    return pattern
+
+def solved(length):
+    return 3 ** length - 1
+
+# Maps a language's letters to small integers
+class Encoder:
+    def __init__(self, letters, words=()):
+        alphabet = {letter.lower() for letter in letters if len(letter) == 1}
+        for word in words:
+            alphabet.update(word)
+        self.alphabet = tuple(sorted(alphabet))
+        self.index = {letter: i for i, letter in enumerate(self.alphabet)}
+
+    # (n, length) uint8 array, one row per word
+    def encode(self, words):
+        words = list(words)
+        length = len(words[0]) if words else 0
+        encoded = np.empty((len(words), length), dtype=np.uint8)
+        for row, word in enumerate(words):
+            encoded[row] = [self.index[letter] for letter in word]
+        return encoded
+
+# Patterns of every guess against every word as a (guesses, words) array
+# Both arguments are encoded (n, length) arrays
+def score_matrix(guesses, words):
+    guesses = np.asarray(guesses)[:, None, :]
+    words = np.asarray(words)[None, :, :]
+    length = guesses.shape[2]
+    green = guesses == words
+    patterns = np.zeros(green.shape[:2], dtype=np.uint32)
+    yellow = []
+    power = 1
+    for i in range(length):
+        # Copies of guess[i] among the word's non-green letters, minus those already marked yellow
+        available = np.zeros(green.shape[:2], dtype=np.uint8)
+        for j in range(length):
+            available += (words[:, :, j] == guesses[:, :, i]) & ~green[:, :, j]
+        for k in range(i):
+            available -= (guesses[:, :, k] == guesses[:, :, i]) & yellow[k]
+        yellow.append(~green[:, :, i] & (available > 0))
+        patterns += (green[:, :, i] * GREEN + yellow[i] * YELLOW).astype(np.uint32) * power
+        power *= 3
+    return patterns.astype(pattern_dtype(length))
+
+# One guess against many words
+def score_words(guess, words):
+    return score_matrix(np.asarray(guess)[None, :], words)[0]
+
+# Many guesses against one word
+def score_guesses(guesses, word):
+    return score_matrix(guesses, np.asarray(word)[None, :])[:, 0]
@@ -0,0 +1,99 @@
+import numpy as np
+try:
+    from . import feedback
+except Exception:
+    import feedback
+
+# Positional letter index over a word list
+# Every set of words is a Python int with bit i set for words[i], so constraints are a few AND/ANDNOTs
+class LetterIndex:
+    def __init__(self, words, solutions=(), length=5):
+        self.words = tuple(word for word in words if len(word) == length)
+        self.length = length
+        self.index = {word: i for i, word in enumerate(self.words)}
+        self.all = (1 << len(self.words)) - 1
+        self.nbytes = (len(self.words) + 7) // 8
+        # (position, letter) -> words with the letter at that position
+        self.positional = {}
+        # letter -> [words with at least 1 copy, words with at least 2 copies, ...]
+        self.at_least = {}
+        positional, at_least = {}, {}
+        for i, word in enumerate(self.words):
+            counts = {}
+            for position, letter in enumerate(word):
+                positional.setdefault((position, letter), []).append(i)
+                counts[letter] = counts.get(letter, 0) + 1
+            for letter, count in counts.items():
+                bitmaps = at_least.setdefault(letter, [])
+                while len(bitmaps) < count:
+                    bitmaps.append([])
+                for n in range(count):
+                    bitmaps[n].append(i)
+        for key, indices in positional.items():
+            self.positional[key] = self.bits(indices)
+        for letter, levels in at_least.items():
+            self.at_least[letter] = [self.bits(indices) for indices in levels]
+        self.solutions = self.bits(self.index[word] for word in solutions if word in self.index)
+
+    def bits(self, indices):
+        bitmap = np.zeros(self.nbytes * 8, dtype=bool)
+        bitmap[list(indices)] = True
+        return int.from_bytes(np.packbits(bitmap, bitorder='little').tobytes(), 'little')
+
+    def _at_least(self, letter, count):
+        if count <= 0:
+            return self.all
+        levels = self.at_least.get(letter, ())
+        return levels[count - 1] if count <= len(levels) else 0
+
+    # Words consistent with every (guess, per-letter statuses) pair
+    # start narrows a mask returned earlier, so a game's later guesses don't replay the first ones
+    def mask(self, guesses, formatted_guesses, solutions_only=False, start=None):
+        if start is not None:
+            mask = start
+        else:
+            mask = self.solutions if solutions_only else self.all
+        for guess, status in zip(guesses, formatted_guesses):
+            if status is None or len(guess) != self.length:
+                continue
+            present = {}
+            for position, (letter, value) in enumerate(zip(guess, status)):
+                if value == feedback.GREEN:
+                    mask &= self.positional.get((position, letter), 0)
+                else:
+                    mask &= ~self.positional.get((position, letter), 0)
+                if value != feedback.GREY:
+                    present[letter] = present.get(letter, 0) + 1
+            for letter in set(guess):
+                count = present.get(letter, 0)
+                mask &= self._at_least(letter, count)
+                # A grey copy means the word has exactly as many as were marked
+                if any(g == letter and value == feedback.GREY for g, value in zip(guess, status)):
+                    mask &= ~self._at_least(letter, count + 1)
+            if not mask:
+                break
+        return mask
+
+    # Words with the fixed letters ({position: letter}) and at least the given copies of each letter ({letter: count})
+    def constrained(self, fixed, minimum):
+        mask = self.all
+        for position, letter in fixed.items():
+            mask &= self.positional.get((position, letter), 0)
+        for letter, count in minimum.items():
+            mask &= self._at_least(letter, count)
+        return mask
+
+    def count(self, mask):
+        return mask.bit_count()
+
+    def allows(self, mask, word):
+        i = self.index.get(word)
+        return i is not None and (mask >> i) & 1 == 1
+
+    # Positions in words of the set bits, in word order
+    def indices(self, mask):
+        bitmap = np.unpackbits(np.frombuffer(mask.to_bytes(self.nbytes, 'little'), dtype=np.uint8), bitorder='little')
+        return np.flatnonzero(bitmap)
+
+    def words_in(self, mask):
+        return [self.words[i] for i in self.indices(mask)]
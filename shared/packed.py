@@ -0,0 +1,128 @@
+import json
+import mmap
+import os
+import struct
+from collections.abc import Sequence
+
+# Packed binary corpus, generated from data/<lang>.json (which stays the source of truth)
+# File layout: 96-byte header, sorted fixed-width wordlist, fixed-width solutions as in the file, JSON metadata
+# Words are UTF-8, NUL-padded to the width of the longest word
+# The header keeps the hash, size and mtime of the JSON it was built from, so loading it never reads the JSON
+MAGIC = b'WDLCRP'
+VERSION = 2
+HEADER = struct.Struct('<6sH32sHIIIQQ')
+HEADER_SIZE = 96
+
+# Read-only view of fixed-width words inside the mapped file
+class PackedWords(Sequence):
+    def __init__(self, view, width, count, is_sorted):
+        self.view = view
+        self.width = width
+        self.count = count
+        self.is_sorted = is_sorted
+
+    def __len__(self):
+        return self.count
+
+    def _raw(self, i):
+        return self.view[i * self.width:(i + 1) * self.width].tobytes()
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self.count))]
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError("word index out of range")
+        return self._raw(i).rstrip(b'\0').decode('utf-8')
+
+    def __iter__(self):
+        raw = self.view.tobytes()
+        for start in range(0, self.count * self.width, self.width):
+            yield raw[start:start + self.width].rstrip(b'\0').decode('utf-8')
+
+    # Binary search over the sorted words
+    def __contains__(self, word):
+        if not isinstance(word, str):
+            return False
+        key = word.encode('utf-8')
+        if len(key) > self.width:
+            return False
+        key = key.ljust(self.width, b'\0')
+        if not self.is_sorted:
+            return any(self._raw(i) == key for i in range(self.count))
+        low, high = 0, self.count
+        while low < high:
+            mid = (low + high) // 2
+            if self._raw(mid) < key:
+                low = mid + 1
+            else:
+                high = mid
+        return low < self.count and self._raw(low) == key
+
+class PackedCorpus:
+    def __init__(self, language, sha256, wordlist, solutions, letters, rows, handle):
+        self.language = language
+        # Hash of the JSON the file was built from
+        self.sha256 = sha256
+        self.wordlist = wordlist
+        self.solutions = solutions
+        self.letters = letters
+        self.rows = rows
+        # Keeps the mapping alive as long as the corpus is used
+        self.handle = handle
+
+def _pack(words, width):
+    return b''.join(word.encode('utf-8').ljust(width, b'\0') for word in words)
+
+# stat is os.stat of the JSON file the data was read from
+def build(path, sha256, stat, language, data):
+    wordlist = sorted(set(data["wordlist"]), key=lambda word: word.encode('utf-8'))
+    solutions = list(data["solutions"])
+    width = max(len(word.encode('utf-8')) for word in wordlist + solutions)
+    meta = json.dumps({
+        "language": language,
+        "letters": data["letters"],
+        "rows": data.get("rows", []),
+    }, ensure_ascii=False).encode('utf-8')
+    header = HEADER.pack(MAGIC, VERSION, bytes.fromhex(sha256), width, len(wordlist), len(solutions), len(meta), stat.st_size, stat.st_mtime_ns)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as out:
+        out.write(header.ljust(HEADER_SIZE, b'\0'))
+        out.write(_pack(wordlist, width))
+        out.write(_pack(solutions, width))
+        out.write(meta)
+    os.replace(tmp_path, path)
+    return len(wordlist), len(solutions)
+
+# Maps a packed file without copying the words, returns None if it is missing or built from another corpus
+# The JSON counts as unchanged while its size and mtime (stat) are the ones recorded at build,
+# otherwise the file is only used if its recorded hash is sha256
+def load(path, stat, sha256=None):
+    try:
+        with open(path, 'rb') as f:
+            handle = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    view = memoryview(handle)
+    if len(view) < HEADER_SIZE:
+        return None
+    magic, version, digest, width, n_wordlist, n_solutions, meta_length, size, mtime_ns = HEADER.unpack(view[:HEADER.size])
+    if magic != MAGIC or version != VERSION:
+        return None
+    if (size, mtime_ns) != (stat.st_size, stat.st_mtime_ns) and (sha256 is None or digest != bytes.fromhex(sha256)):
+        return None
+    wordlist_end = HEADER_SIZE + width * n_wordlist
+    solutions_end = wordlist_end + width * n_solutions
+    if len(view) != solutions_end + meta_length:
+        return None
+    meta = json.loads(view[solutions_end:].tobytes())
+    return PackedCorpus(
+        meta["language"],
+        digest.hex(),
+        PackedWords(view[HEADER_SIZE:wordlist_end], width, n_wordlist, True),
+        PackedWords(view[wordlist_end:solutions_end], width, n_solutions, False),
+        tuple(meta["letters"]),
+        tuple(tuple(row) for row in meta["rows"]),
+        handle,
+    )
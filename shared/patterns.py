@@ -0,0 +1,75 @@
+import hashlib
+import os
+import struct
+import numpy as np
+try:
+    from . import feedback
+except Exception:
+    import feedback
+
+# Precomputed guess x solution pattern matrix
+# File layout: 64-byte header, then a row-major (guesses, solutions) matrix of base-3 patterns
+# Guesses are the sorted wordlist (plus solutions), solutions keep their order in the language file
+MAGIC = b'WDLPAT'
+VERSION = 1
+HEADER = struct.Struct('<6sH32sHIIB')
+HEADER_SIZE = 64
+CHUNK = 512
+
+def word_lists(wordlist, solutions, length=5):
+    solutions = tuple(word.strip().lower() for word in solutions if len(word.strip()) == length)
+    guesses = tuple(sorted(set(word for word in wordlist if len(word) == length) | set(solutions)))
+    return guesses, solutions
+
+class PatternMatrix:
+    def __init__(self, matrix, guesses, solutions):
+        self.matrix = matrix
+        self.guesses = guesses
+        self.solutions = solutions
+        self.guess_index = {word: i for i, word in enumerate(guesses)}
+        self.solution_index = {word: i for i, word in enumerate(solutions)}
+
+    def pattern(self, guess, solution):
+        return int(self.matrix[self.guess_index[guess], self.solution_index[solution]])
+
+def build(path, sha256, letters, wordlist, solutions, length=5):
+    guesses, solutions = word_lists(wordlist, solutions, length)
+    encoder = feedback.Encoder(letters, guesses)
+    encoded_solutions = encoder.encode(solutions)
+    dtype = feedback.pattern_dtype(length)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as out:
+        header = HEADER.pack(MAGIC, VERSION, bytes.fromhex(sha256), length, len(guesses), len(solutions), np.dtype(dtype).itemsize)
+        out.write(header.ljust(HEADER_SIZE, b'\0'))
+        for start in range(0, len(guesses), CHUNK):
+            out.write(feedback.score_matrix(encoder.encode(guesses[start:start + CHUNK]), encoded_solutions).tobytes())
+    os.replace(tmp_path, path)
+    return len(guesses), len(solutions)
+
+# Memory-maps a matrix file, returns None if it is missing, outdated or built from another corpus
+def load(path, sha256, wordlist, solutions, length=5):
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(HEADER_SIZE)
+    except OSError:
+        return None
+    if len(header) < HEADER_SIZE:
+        return None
+    magic, version, digest, file_length, n_guesses, n_solutions, itemsize = HEADER.unpack(header[:HEADER.size])
+    if magic != MAGIC or version != VERSION or digest != bytes.fromhex(sha256) or file_length != length:
+        return None
+    guesses, solutions = word_lists(wordlist, solutions, length)
+    dtype = feedback.pattern_dtype(length)
+    if (n_guesses, n_solutions, itemsize) != (len(guesses), len(solutions), np.dtype(dtype).itemsize):
+        return None
+    if os.path.getsize(path) != HEADER_SIZE + n_guesses * n_solutions * itemsize:
+        return None
+    matrix = np.memmap(path, dtype=dtype, mode='r', offset=HEADER_SIZE, shape=(n_guesses, n_solutions))
+    return PatternMatrix(matrix, guesses, solutions)
+
+def file_sha256(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
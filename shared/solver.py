@@ -0,0 +1,116 @@
+import threading
+import numpy as np
+try:
+    from . import feedback, patterns, letterindex
+except Exception:
+    import feedback, patterns, letterindex
+
+CHUNK = 2048
+
+# Shannon entropy (in bits) of the pattern distribution of every row
+def entropies(matrix, length):
+    n_patterns = 3 ** length
+    rows, columns = matrix.shape
+    result = np.empty(rows, dtype=np.float64)
+    for start in range(0, rows, CHUNK):
+        chunk = np.asarray(matrix[start:start + CHUNK], dtype=np.int64)
+        size = chunk.shape[0]
+        if columns < n_patterns:
+            # Few candidates: count runs in the sorted rows instead of histogramming every pattern
+            chunk.sort(axis=1)
+            boundaries = np.ones(chunk.shape, dtype=bool)
+            boundaries[:, 1:] = chunk[:, 1:] != chunk[:, :-1]
+            starts = np.flatnonzero(boundaries.ravel())
+            counts = np.diff(np.append(starts, size * columns))
+            row = starts // columns
+        else:
+            offsets = (np.arange(size, dtype=np.int64) * n_patterns)[:, None]
+            counts = np.bincount((chunk + offsets).ravel(), minlength=size * n_patterns)
+            row = np.repeat(np.arange(size), n_patterns)
+            row, counts = row[counts > 0], counts[counts > 0]
+        weighted = np.bincount(row, weights=counts * np.log2(counts), minlength=size)
+        result[start:start + size] = np.log2(columns) - weighted / columns
+    return result
+
+# Entropy-ranked next guesses for one language
+# Candidates are arrays of solution indices; the opening ranking is computed once and cached
+class Solver:
+    def __init__(self, letters, wordlist, solutions, matrix=None, length=5):
+        self.guesses, self.solutions = patterns.word_lists(wordlist, solutions, length)
+        self.length = length
+        self.guess_index = {word: i for i, word in enumerate(self.guesses)}
+        self.solution_index = {word: i for i, word in enumerate(self.solutions)}
+        self.is_solution = np.zeros(len(self.guesses), dtype=bool)
+        self.is_solution[[self.guess_index[word] for word in self.solutions]] = True
+        # Solution index of every guess, -1 for words that can't be the answer
+        self.solution_of = np.full(len(self.guesses), -1, dtype=np.int64)
+        self.solution_of[[self.guess_index[word] for word in self.solutions]] = np.arange(len(self.solutions))
+        # Positional letter index over the guesses, word i of the index is guess i
+        self.index = letterindex.LetterIndex(self.guesses, self.solutions, length)
+        # A PatternMatrix built from the same corpus, otherwise patterns are scored on the fly
+        self.matrix = matrix.matrix if matrix is not None else None
+        encoder = feedback.Encoder(letters, self.guesses)
+        self.encoded_guesses = encoder.encode(self.guesses)
+        self.encoded_solutions = encoder.encode(self.solutions)
+        self.lock = threading.Lock()
+        self.opening = None
+
+    def all_candidates(self):
+        return np.arange(len(self.solutions))
+
+    # Entropy of every guess row against the candidates
+    # Patterns come from the matrix or are scored on the fly, patterns.CHUNK rows at a time so memory stays bounded
+    def _entropies(self, candidates, rows):
+        scores = np.empty(len(rows), dtype=np.float64)
+        encoded_candidates = self.encoded_solutions[candidates] if self.matrix is None else None
+        for start in range(0, len(rows), patterns.CHUNK):
+            chunk = rows[start:start + patterns.CHUNK]
+            if self.matrix is not None:
+                chunk_patterns = self.matrix[np.ix_(chunk, candidates)]
+            else:
+                chunk_patterns = feedback.score_matrix(self.encoded_guesses[chunk], encoded_candidates)
+            scores[start:start + len(chunk)] = entropies(chunk_patterns, self.length)
+        return scores
+
+    # Keeps the candidates that would have produced the pattern for the guess
+    def filter(self, candidates, guess, pattern):
+        i = self.guess_index.get(guess)
+        if i is None:
+            return candidates
+        if self.matrix is not None:
+            scored = self.matrix[i, candidates]
+        else:
+            scored = feedback.score_words(self.encoded_guesses[i], self.encoded_solutions[candidates])
+        return candidates[scored == pattern]
+
+    # Candidates of a letter index mask over the solutions
+    def from_mask(self, mask):
+        return self.solution_of[self.index.indices(mask)]
+
+    # Candidates consistent with every guess and its pattern, from the letter index
+    def candidates(self, guesses, guess_patterns):
+        formatted_guesses = [feedback.statuses(pattern, self.length) for pattern in guess_patterns]
+        return self.from_mask(self.index.mask(guesses, formatted_guesses, solutions_only=True))
+
+    def _rank(self, candidates, rows):
+        scores = self._entropies(candidates, rows)
+        playable = np.zeros(len(self.guesses), dtype=bool)
+        playable[[self.guess_index[self.solutions[i]] for i in candidates]] = True
+        # Highest entropy first, guesses that can still win break ties
+        order = np.lexsort((~playable[rows], -scores))
+        return [(self.guesses[rows[i]], float(scores[i])) for i in order]
+
+    # Top-k guesses as (word, expected information in bits)
+    # allowed limits the ranking to some guess indices, i.e. the words hard mode still accepts
+    def rank(self, candidates, k=5, allowed=None):
+        if len(candidates) <= 2:
+            return [(self.solutions[i], 0.0 if len(candidates) == 1 else 1.0) for i in candidates][:k]
+        if allowed is not None:
+            return self._rank(candidates, np.asarray(allowed))[:k]
+        rows = np.arange(len(self.guesses))
+        if len(candidates) == len(self.solutions):
+            with self.lock:
+                if self.opening is None:
+                    self.opening = self._rank(candidates, rows)[:100]
+            return self.opening[:k]
+        return self._rank(candidates, rows)[:k]
@@ -0,0 +1,109 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+# Answers of the model to "is this a valid word", keyed by (model, language, word)
+# An in-memory LRU in front of a SQLite table shared by every process using the same file
+# Entries expire after the TTL in both, so a model that changes its mind is asked again eventually
+class ValidationCache:
+    def __init__(self, path, ttl, capacity=10000):
+        # ttl() -> seconds
+        self.path = path
+        self.capacity = capacity
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        # key -> (valid, checked_at), least recently used first
+        self.entries = OrderedDict()
+        self.connection = None
+
+    # Opened on first use, so a process forked after creating the cache gets its own connection
+    def _connect(self):
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS word_check ("
+                "model TEXT NOT NULL, language TEXT NOT NULL, word TEXT NOT NULL, "
+                "valid INTEGER NOT NULL, checked_at REAL NOT NULL, "
+                "PRIMARY KEY (model, language, word))"
+            )
+            self.connection.commit()
+        return self.connection
+
+    def _remember(self, key, valid, checked_at):
+        self.entries[key] = (valid, checked_at)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    # True or False if the answer is known and fresh, None otherwise
+    def get(self, key):
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                entry = self._connect().execute(
+                    "SELECT valid, checked_at FROM word_check WHERE model = ? AND language = ? AND word = ?", key
+                ).fetchone()
+                if entry is None:
+                    return None
+            if now - entry[1] >= self.ttl():
+                self.entries.pop(key, None)
+                return None
+            self._remember(key, bool(entry[0]), entry[1])
+            return bool(entry[0])
+
+    def put(self, key, valid):
+        now = time.time()
+        with self.lock:
+            self._remember(key, valid, now)
+            connection = self._connect()
+            connection.execute(
+                "INSERT OR REPLACE INTO word_check (model, language, word, valid, checked_at) VALUES (?, ?, ?, ?, ?)",
+                (*key, int(valid), now)
+            )
+            connection.commit()
+
+# Validates guesses from the cheapest source that knows the answer: the local wordlist, the cache, then the model
+# Only words found in the wordlist are accepted locally, the model may know words the wordlist lacks
+# Concurrent misses for the same word wait for a single model call
+class WordChecker:
+    def __init__(self, ask, cache, wordlist):
+        # ask(model, language, word) -> bool, wordlist(language) -> collection of words or None
+        self.ask = ask
+        self.cache = cache
+        self.wordlist = wordlist
+        self.lock = threading.Lock()
+        self.pending = {}
+
+    def check(self, model, language, word):
+        word = word.strip().lower()
+        words = self.wordlist(language)
+        if words is not None and word in words:
+            return True
+        key = (model, language, word)
+        valid = self.cache.get(key)
+        if valid is not None:
+            return valid
+
+        with self.lock:
+            future = self.pending.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self.pending[key] = future
+        if not leader:
+            return future.result()
+
+        try:
+            valid = bool(self.ask(model, language, word))
+            self.cache.put(key, valid)
+            future.set_result(valid)
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with self.lock:
+                del self.pending[key]
+        return future.result()
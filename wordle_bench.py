@@ -0,0 +1,77 @@
+import argparse
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from server import utils
+from shared import feedback
+
+STRATEGIES = ('entropy', 'random', 'first')
+
+_solver = None
+_strategy = None
+_opening = None
+_max_guesses = 6
+
+def _init(language, strategy, opening, max_guesses):
+    global _solver, _strategy, _opening, _max_guesses
+    _solver = utils.solver(language)
+    _strategy = strategy
+    _opening = opening
+    _max_guesses = max_guesses
+
+def _pick(candidates, rng):
+    if _strategy == 'entropy':
+        return _solver.rank(candidates, 1)[0][0]
+    if _strategy == 'random':
+        return _solver.solutions[rng.choice(candidates)]
+    return _solver.solutions[candidates[0]]
+
+# Plays one game with the configured strategy, returns the number of guesses or None on failure
+def play(answer):
+    rng = random.Random(answer)
+    candidates = _solver.all_candidates()
+    solved = feedback.solved(_solver.length)
+    for guess_number in range(1, _max_guesses + 1):
+        guess = _opening if guess_number == 1 and _opening else _pick(candidates, rng)
+        pattern = feedback.score(guess, answer)
+        if pattern == solved:
+            return guess_number
+        candidates = _solver.filter(candidates, guess, pattern)
+    return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Plays a solver strategy against every solution of a language")
+    parser.add_argument('--language', default='en')
+    parser.add_argument('--strategy', choices=STRATEGIES, default='entropy')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--max-guesses', type=int, default=6)
+    parser.add_argument('--limit', type=int, default=None, help="only play the first N solutions")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    solver = utils.solver(args.language)
+    answers = solver.solutions[:args.limit]
+    opening = solver.rank(solver.all_candidates(), 1)[0][0] if args.strategy == 'entropy' else None
+
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init, initargs=(args.language, args.strategy, opening, args.max_guesses)) as pool:
+        results = list(pool.map(play, answers, chunksize=max(len(answers) // (args.workers * 4), 1)))
+    elapsed = time.perf_counter() - start
+
+    solved = [result for result in results if result is not None]
+    failures = [answer for answer, result in zip(answers, results) if result is None]
+    distribution = Counter(solved)
+    print(f"Language: {args.language}, strategy: {args.strategy}, workers: {args.workers}")
+    print(f"Games: {len(answers)}, solved: {len(solved)}, failures: {len(failures)}")
+    if solved:
+        print(f"Average guesses: {sum(solved) / len(solved):.3f}")
+    print("Distribution:")
+    for guesses in range(1, args.max_guesses + 1):
+        print(f"{guesses:>3}: {distribution[guesses]:>6}")
+    if failures:
+        print(f"Failed words: {', '.join(failures[:20])}{' ...' if len(failures) > 20 else ''}")
+    print(f"Wall time: {elapsed:.2f}s ({len(answers) / elapsed:.1f} games/s)")
+
+if __name__ == '__main__':
+    main()